@@ -0,0 +1,76 @@
+from heapq import nsmallest
+from itertools import count
+from threading import Lock
+
+from Utils import decrypt, get_encryption_table, get_decryption_table
+
+
+class CipherContext(object):
+    def __init__(self, key):
+        self.key = key
+        self.encryption_table = get_encryption_table(key)
+        self.decryption_table = get_decryption_table(key)
+
+    def encrypt(self, message):
+        return str(message).translate(self.encryption_table)
+
+    def decrypt(self, message):
+        if not isinstance(message, str):
+            return decrypt(message, self.key)
+        return message.translate(self.decryption_table)
+
+
+class CipherContextCache(object):
+    def __init__(self, keys, max_size=1024):
+        self.keys = keys
+        self.max_size = max_size
+        self.eviction_batch = max(1, max_size / 8)
+        self.contexts = {}
+        self.clock = count()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, identifier):
+        key = self.keys[identifier]
+        context = self.contexts.get(identifier)
+        if context is not None and context.key == key:
+            context.last_used = next(self.clock)
+            self.hits += 1
+            return context
+        return self.replace(identifier, key)
+
+    def replace(self, identifier, key):
+        with self.lock:
+            stale = self.contexts.pop(identifier, None)
+            if stale is not None and stale.key != key:
+                self.invalidations += 1
+            self.misses += 1
+            self.evict_if_full()
+            context = CipherContext(key)
+            context.last_used = next(self.clock)
+            self.contexts[identifier] = context
+        return context
+
+    def evict_if_full(self):
+        if not self.max_size or len(self.contexts) < self.max_size:
+            return
+        oldest = nsmallest(self.eviction_batch, self.contexts.items(), key=lambda item: item[1].last_used)
+        for identifier, _ in oldest:
+            del self.contexts[identifier]
+        self.evictions += len(oldest)
+
+    def invalidate(self, identifier):
+        with self.lock:
+            if self.contexts.pop(identifier, None) is not None:
+                self.invalidations += 1
+
+    def statistics(self):
+        with self.lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'invalidations': self.invalidations,
+                    'size': len(self.contexts)}
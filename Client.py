@@ -1,70 +1,63 @@
-from Server import AbstractEntity, InvalidMessage
-from Utils import generate_random_key, prepare_inner_message, decrypt
+from time import time
 
+from Instrumentation import disabled
+from Protocol import ClientMachine, SERVER
+from Server import AbstractEntity
 
-class Client(AbstractEntity):
-    def __init__(self, client_id=None, client_key=None, server=None, server_id=None):
+
+class Client(ClientMachine, AbstractEntity):
+    def __init__(self, client_id=None, client_key=None, server=None, server_id=None, session_key=None,
+                 instrumentation=None, codec=None, timeout=None):
         AbstractEntity.__init__(self)
-        self.ok_signal = 'OK'
+        ClientMachine.__init__(self, codec=codec)
+        self.instrumentation = instrumentation or disabled
+        self.timeout = timeout
+        self.assign(client_id, client_key, server, server_id, session_key)
+
+    def assign(self, client_id, client_key, server, server_id, session_key=None):
         self.client_id = client_id
         self.client_key = client_key
         self.server = server
         self.server_id = server_id
-        self.server_worker_input = None
-        self.server_worker_output = None
-        self.random_value = None
-        self.nonce = None
-        self.server_random_value = None
-        self.session_key = None
-        self.trusted_nonce = None
+        self.reset_session()
+        self.session_key = session_key
 
     def run(self):
-        self.server_worker_input, self.server_worker_output = self.establish_connection(self.server)
-        self.server_worker_input.put(self.prepare_message_for_server())
-        message_from_server = self.server_worker_output.get()
-        response = self.process_message_from_server(message_from_server)
-        self.evaluate_response(response)
+        self.evaluate_response(self.handshake())
 
-    def prepare_message_for_server(self):
-        self.generate_and_save_random_value()
-        self.generate_and_save_nonce()
-        return self.random_value, \
-               self.client_id, \
-               self.server_id, \
-               self.generate_nested_message_for_trusted()
+    def handshake(self):
+        self.start_deadline()
+        destination, message = self.begin()[0]
+        while destination == SERVER:
+            message_from_server = self.send_to_server(message)
+            started = self.instrumentation.start()
+            destination, message = self.feed(message_from_server)[0]
+            self.instrumentation.stop('client_process_response', started)
+        return message
 
-    def generate_and_save_random_value(self):
-        self.random_value = generate_random_key()
+    def start_deadline(self):
+        self.deadline = None
+        if self.timeout is not None:
+            self.deadline = time() + self.timeout
 
-    def generate_nested_message_for_trusted(self):
-        return prepare_inner_message(self.client_key,
-                                     self.nonce,
-                                     self.random_value,
-                                     self.client_id,
-                                     self.server_id)
+    def hello_message(self, reply_queue):
+        return self.identified_hello(self.client_id, reply_queue)
 
-    def generate_and_save_nonce(self):
-        self.nonce = str(generate_random_key())
-
-    def process_message_from_server(self, message_from_server):
-        try:
-            self.unpack_message_from_server(message_from_server)
-            self.unpack_nested_message_from_trusted(message_from_server[1])
-            self.validate_nonce_from_trusted_server_matches()
-            self.validate_random_value()
-        except(IndexError, InvalidMessage, ValueError):
+    def send_to_server(self, message):
+        connection = self.establish_connection(self.server)
+        if self.is_message_error(connection):
             return self.error_signal
-        return self.ok_signal
-
-    def unpack_nested_message_from_trusted(self, encrypted_message):
-        decrypted = decrypt(encrypted_message, self.client_key).split(':')
-        self.validate_message_length(decrypted, 2)
-        self.trusted_nonce = decrypted[0]
-        self.session_key = decrypted[1]
+        return self.send_over_connection(connection, message)
 
-    def validate_nonce_from_trusted_server_matches(self):
-        if self.trusted_nonce != self.nonce:
-            raise InvalidMessage
+    def send_over_connection(self, connection, message):
+        self.server_worker_input, self.server_worker_output = connection
+        started = self.instrumentation.start()
+        self.server_worker_input.put(message)
+        message_from_server = self.get_before_deadline(self.server_worker_output)
+        self.instrumentation.stop('client_server_roundtrip', started)
+        if self.is_timeout(message_from_server):
+            return self.error_signal
+        return message_from_server
 
     def evaluate_response(self, response):
         if response == self.error_signal:
@@ -77,12 +70,3 @@ class Client(AbstractEntity):
 
     def print_ok_response(self):
         print self.ok_signal
-
-    def unpack_message_from_server(self, message_from_server):
-        self.validate_message_length(message_from_server, 2)
-        self.server_random_value = int(message_from_server[0])
-        self.unpack_nested_message_from_trusted(message_from_server[1])
-
-    def validate_random_value(self):
-        if self.random_value != self.server_random_value:
-            raise InvalidMessage
@@ -0,0 +1,125 @@
+from collections import deque
+
+from CipherCache import CipherContextCache
+from Protocol import ClientMachine, ServerWorkerMachine, TrustedMachine, SERVER, TRUSTED
+from Sessions import ServerSession
+
+
+class EventLoop(object):
+    def __init__(self):
+        self.ready = deque()
+
+    def spawn(self, coroutine):
+        self.resume(coroutine, None)
+
+    def resume(self, coroutine, value):
+        self.ready.append((coroutine, value))
+
+    def run(self):
+        while self.ready:
+            coroutine, value = self.ready.popleft()
+            try:
+                channel = coroutine.send(value)
+            except StopIteration:
+                continue
+            channel.wait(coroutine)
+
+
+class Channel(object):
+    def __init__(self, loop):
+        self.loop = loop
+        self.items = deque()
+        self.waiters = deque()
+
+    def put(self, item):
+        if self.waiters:
+            self.loop.resume(self.waiters.popleft(), item)
+        else:
+            self.items.append(item)
+
+    def wait(self, coroutine):
+        if self.items:
+            self.loop.resume(coroutine, self.items.popleft())
+        else:
+            self.waiters.append(coroutine)
+
+
+class AbstractCooperativeServer(object):
+    def __init__(self, loop):
+        self.loop = loop
+        self.worker = None
+
+    def connect(self):
+        input_channel = Channel(self.loop)
+        output_channel = Channel(self.loop)
+        self.loop.spawn(self.session(input_channel, output_channel))
+        return input_channel, output_channel
+
+    def session(self, input_channel, output_channel):
+        raise NotImplementedError
+
+    def get_new_worker(self):
+        raise NotImplementedError
+
+
+class CooperativeTrustedServer(AbstractCooperativeServer):
+    def __init__(self, loop, keys, cipher_cache_size=1024, codec=None):
+        AbstractCooperativeServer.__init__(self, loop)
+        self.keys = keys
+        self.codec = codec
+        self.cipher_cache = CipherContextCache(keys, cipher_cache_size)
+        self.worker = self.get_new_worker()
+
+    def get_new_worker(self):
+        return TrustedMachine(self.keys, self.cipher_cache, codec=self.codec)
+
+    def session(self, input_channel, output_channel):
+        message_from_server = yield input_channel
+        self.worker.reset_session()
+        _, message_for_server = self.worker.feed(message_from_server)[0]
+        output_channel.put(message_for_server)
+
+
+class CooperativeServer(AbstractCooperativeServer):
+    def __init__(self, loop, server_id, server_key, trusted_server, codec=None):
+        AbstractCooperativeServer.__init__(self, loop)
+        self.server_id = server_id
+        self.server_key = server_key
+        self.trusted_server = trusted_server
+        self.codec = codec
+        self.worker = self.get_new_worker()
+
+    def get_new_worker(self):
+        return ServerWorkerMachine(self.server_id, self.server_key, codec=self.codec)
+
+    def session(self, input_channel, output_channel):
+        message_from_client = yield input_channel
+        session = self.worker.session = ServerSession()
+        destination, message = self.worker.feed(message_from_client)[0]
+        if destination == TRUSTED:
+            trusted_input, trusted_output = self.trusted_server.connect()
+            trusted_input.put(message)
+            message_from_trusted = yield trusted_output
+            self.worker.session = session
+            destination, message = self.worker.feed(message_from_trusted)[0]
+        output_channel.put(message)
+
+
+class CooperativeClient(object):
+    def __init__(self, loop, client_id, client_key, server, server_id, codec=None):
+        self.loop = loop
+        self.client = ClientMachine(client_id, client_key, server_id, codec=codec)
+        self.server = server
+        self.response = None
+
+    def start(self):
+        self.loop.spawn(self.run())
+
+    def run(self):
+        destination, message = self.client.begin()[0]
+        while destination == SERVER:
+            server_input, server_output = self.server.connect()
+            server_input.put(message)
+            message_from_server = yield server_output
+            destination, message = self.client.feed(message_from_server)[0]
+        self.response = message
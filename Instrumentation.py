@@ -0,0 +1,120 @@
+from bisect import bisect_left
+from threading import Lock
+from time import time
+
+bucket_bounds = [0.000001 * 2 ** exponent for exponent in range(28)]
+
+
+class Histogram(object):
+    def __init__(self):
+        self.counts = [0] * (len(bucket_bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def record(self, value):
+        self.counts[bisect_left(bucket_bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        seen = 0
+        for position, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= threshold and bucket_count:
+                return bucket_bounds[position] if position < len(bucket_bounds) else self.maximum
+        return self.maximum
+
+    def summary(self):
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.percentile(0.50),
+                'p95': self.percentile(0.95),
+                'p99': self.percentile(0.99),
+                'max': self.maximum}
+
+
+class LevelHistogram(Histogram):
+    def __init__(self):
+        Histogram.__init__(self)
+        self.levels = {}
+
+    def record(self, value):
+        self.levels[value] = self.levels.get(value, 0) + 1
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+
+    def percentile(self, fraction):
+        threshold = fraction * self.count
+        seen = 0
+        for level in sorted(self.levels):
+            seen += self.levels[level]
+            if seen >= threshold:
+                return level
+        return self.maximum
+
+
+class AbstractSink(object):
+    def record(self, name, value):
+        raise NotImplementedError
+
+    def observe(self, name, value):
+        raise NotImplementedError
+
+
+class HistogramSink(AbstractSink):
+    def __init__(self):
+        self.histograms = {}
+        self.lock = Lock()
+
+    def record(self, name, value):
+        self.record_into(name, value, Histogram)
+
+    def observe(self, name, value):
+        self.record_into(name, value, LevelHistogram)
+
+    def record_into(self, name, value, histogram_type):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = histogram_type()
+            histogram.record(value)
+
+    def snapshot(self):
+        with self.lock:
+            return dict((name, histogram.summary()) for name, histogram in self.histograms.items())
+
+
+class Instrumentation(object):
+    def __init__(self, sink):
+        self.sink = sink
+
+    @staticmethod
+    def start():
+        return time()
+
+    def stop(self, stage, started):
+        self.sink.record(stage, time() - started)
+
+    def observe(self, name, value):
+        self.sink.observe(name, value)
+
+
+class DisabledInstrumentation(object):
+    @staticmethod
+    def start():
+        return None
+
+    def stop(self, stage, started):
+        pass
+
+    def observe(self, name, value):
+        pass
+
+
+disabled = DisabledInstrumentation()
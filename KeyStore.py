@@ -0,0 +1,125 @@
+import mmap
+import os
+from threading import Lock
+from time import time
+
+
+class AbstractKeyStore(object):
+    def __getitem__(self, identifier):
+        key = self.get(identifier)
+        if key is None:
+            raise KeyError(identifier)
+        return key
+
+    def __contains__(self, identifier):
+        return self.get(identifier) is not None
+
+    def get(self, identifier, default=None):
+        raise NotImplementedError
+
+    def items(self):
+        raise NotImplementedError
+
+    def reload(self):
+        return False
+
+
+class DictKeyStore(AbstractKeyStore):
+    def __init__(self, keys=None):
+        self.keys = dict(keys or {})
+
+    def __setitem__(self, identifier, key):
+        self.keys[identifier] = key
+
+    def get(self, identifier, default=None):
+        return self.keys.get(identifier, default)
+
+    def items(self):
+        return self.keys.items()
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class FileKeyStore(AbstractKeyStore):
+    def __init__(self, path, reload_interval=None, clock=time):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.clock = clock
+        self.lock = Lock()
+        self.mapping = None
+        self.signature = None
+        self.last_check = clock()
+        self.reloads = 0
+        self.load()
+
+    @staticmethod
+    def write(path, keys):
+        lines = []
+        for identifier, key in sorted((str(identifier), int(key)) for identifier, key in keys.items()):
+            if '\t' in identifier or '\n' in identifier:
+                raise ValueError('identifiers cannot contain tabs or newlines')
+            lines.append('{0}\t{1}\n'.format(identifier, key))
+        temporary_path = '{0}.tmp'.format(path)
+        with open(temporary_path, 'wb') as output:
+            output.write(''.join(lines))
+        os.rename(temporary_path, path)
+
+    def stat_signature(self):
+        status = os.stat(self.path)
+        return status.st_ino, status.st_size, status.st_mtime
+
+    def load(self):
+        with open(self.path, 'rb') as key_file:
+            signature = os.fstat(key_file.fileno())
+            mapping = None
+            if signature.st_size:
+                mapping = mmap.mmap(key_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mapping = mapping
+        self.signature = signature.st_ino, signature.st_size, signature.st_mtime
+
+    def reload(self):
+        with self.lock:
+            self.last_check = self.clock()
+            if self.stat_signature() == self.signature:
+                return False
+            self.load()
+            self.reloads += 1
+            return True
+
+    def reload_if_due(self):
+        if self.reload_interval is not None and self.clock() - self.last_check >= self.reload_interval:
+            self.reload()
+
+    def get(self, identifier, default=None):
+        self.reload_if_due()
+        key = self.find(self.mapping, str(identifier))
+        return default if key is None else key
+
+    @staticmethod
+    def find(mapping, identifier):
+        if mapping is None:
+            return None
+        low, high = 0, len(mapping)
+        while low < high:
+            middle = (low + high) // 2
+            newline = mapping.rfind('\n', low, middle)
+            start = newline + 1 if newline >= 0 else low
+            end = mapping.find('\n', start)
+            if end < 0:
+                end = len(mapping)
+            line_identifier, _, key = mapping[start:end].partition('\t')
+            if line_identifier == identifier:
+                return int(key)
+            if line_identifier < identifier:
+                low = end + 1
+            else:
+                high = start
+        return None
+
+    def items(self):
+        self.reload_if_due()
+        if self.mapping is None:
+            return []
+        return [(identifier, int(key)) for identifier, _, key in
+                (line.partition('\t') for line in self.mapping[:].splitlines())]
@@ -0,0 +1,76 @@
+import struct
+from collections import namedtuple
+
+from Utils import split_fields, InvalidMessage
+
+ClientRequest = namedtuple('ClientRequest', 'random_value client_id server_id client_ticket')
+TrustedRequest = namedtuple('TrustedRequest', 'random_value client_id server_id client_ticket server_ticket')
+TrustedResponse = namedtuple('TrustedResponse', 'random_value client_ticket server_ticket')
+ServerResponse = namedtuple('ServerResponse', 'random_value client_ticket')
+InnerTicket = namedtuple('InnerTicket', 'nonce random_value client_id server_id')
+SessionTicket = namedtuple('SessionTicket', 'nonce session_key')
+
+
+class StringCodec(object):
+    inner_fields = (str, int, str, str)
+    session_fields = (str, str)
+
+    def encode_inner(self, ticket):
+        return '{0}:{1}:{2}:{3}'.format(*ticket)
+
+    def decode_inner(self, plaintext):
+        return InnerTicket._make(split_fields(plaintext, self.inner_fields))
+
+    def encode_session(self, ticket):
+        return '{0}:{1}'.format(*ticket)
+
+    def decode_session(self, plaintext):
+        return SessionTicket._make(split_fields(plaintext, self.session_fields))
+
+
+class StructCodec(object):
+    identifier_width = 32
+    inner_layout = struct.Struct('!Qq{0}s{0}s'.format(identifier_width))
+    session_layout = struct.Struct('!QQ')
+
+    def encode_inner(self, ticket):
+        return self.pack(self.inner_layout, int(ticket.nonce), ticket.random_value,
+                         self.identifier(ticket.client_id), self.identifier(ticket.server_id))
+
+    def decode_inner(self, plaintext):
+        nonce, random_value, client_id, server_id = self.unpack(self.inner_layout, plaintext)
+        client_id = client_id.rstrip('\0')
+        server_id = server_id.rstrip('\0')
+        if not client_id or not server_id:
+            raise InvalidMessage
+        return InnerTicket(str(nonce), random_value, client_id, server_id)
+
+    def encode_session(self, ticket):
+        return self.pack(self.session_layout, int(ticket.nonce), int(ticket.session_key))
+
+    def decode_session(self, plaintext):
+        nonce, session_key = self.unpack(self.session_layout, plaintext)
+        return SessionTicket(str(nonce), str(session_key))
+
+    def identifier(self, value):
+        if len(value) > self.identifier_width or '\0' in value:
+            raise ValueError('identifiers must fit in {0} bytes'.format(self.identifier_width))
+        return value
+
+    @staticmethod
+    def pack(layout, *fields):
+        try:
+            return layout.pack(*fields)
+        except struct.error:
+            raise ValueError('ticket fields do not fit {0}'.format(layout.format))
+
+    @staticmethod
+    def unpack(layout, plaintext):
+        try:
+            return layout.unpack(plaintext)
+        except struct.error:
+            raise IndexError
+
+
+string_codec = StringCodec()
+struct_codec = StructCodec()
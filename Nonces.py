@@ -0,0 +1,81 @@
+import os
+import random
+from collections import deque
+from threading import Lock, local
+
+
+class AbstractRandomPool(object):
+    def __init__(self, pool_size=256, first_pool_size=1):
+        self.pool_size = pool_size
+        self.first_pool_size = min(first_pool_size, pool_size)
+        self.local = local()
+        self.lock = Lock()
+        self.seed()
+
+    def next(self):
+        try:
+            return self.local.pool.pop()
+        except (AttributeError, IndexError):
+            return self.refill()
+
+    def seed(self):
+        self.pid = os.getpid()
+        self.source = random.Random(long(os.urandom(16).encode('hex'), 16))
+
+    def refill(self):
+        state = self.local
+        size = getattr(state, 'size', 0)
+        state.size = min(size * 2, self.pool_size) if size else self.first_pool_size
+        with self.lock:
+            if self.pid != os.getpid():
+                self.seed()
+            source = self.source
+            state.pool = [self.draw(source) for _ in xrange(state.size)]
+        return state.pool.pop()
+
+    def draw(self, source):
+        raise NotImplementedError
+
+
+class NonceGenerator(AbstractRandomPool):
+    def __init__(self, width=62, pool_size=256, first_pool_size=1):
+        AbstractRandomPool.__init__(self, pool_size, first_pool_size)
+        self.width = width
+
+    def draw(self, source):
+        return int(source.getrandbits(self.width))
+
+
+class KeyGenerator(AbstractRandomPool):
+    def __init__(self, upper_bound=100000, pool_size=256, first_pool_size=1):
+        AbstractRandomPool.__init__(self, pool_size, first_pool_size)
+        self.upper_bound = upper_bound
+
+    def draw(self, source):
+        return source.randint(0, self.upper_bound)
+
+
+class DuplicateDetector(object):
+    def __init__(self, capacity=65536):
+        self.capacity = capacity
+        self.recent = deque()
+        self.seen = set()
+        self.lock = Lock()
+        self.duplicates = 0
+
+    def is_duplicate(self, nonce):
+        with self.lock:
+            if nonce in self.seen:
+                self.duplicates += 1
+                return True
+            if len(self.recent) == self.capacity:
+                self.seen.discard(self.recent.popleft())
+            self.recent.append(nonce)
+            self.seen.add(nonce)
+            return False
+
+    def statistics(self):
+        with self.lock:
+            return {'remembered': len(self.recent),
+                    'capacity': self.capacity,
+                    'duplicates': self.duplicates}
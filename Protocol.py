@@ -0,0 +1,385 @@
+from CipherCache import CipherContextCache
+from Messages import ClientRequest, TrustedRequest, TrustedResponse, ServerResponse, InnerTicket, SessionTicket, \
+    string_codec
+from Sessions import ClientSession, ServerSession, TrustedSession, session_attributes
+from Utils import generate_nonce, generate_random_key, encrypt, decrypt, parse_encrypted_fields, InvalidMessage
+
+CLIENT = 'client'
+SERVER = 'server'
+TRUSTED = 'trusted'
+RESULT = 'result'
+
+
+class AbstractMachine(object):
+    def __init__(self):
+        self.error_signal = 'ERROR'
+        self.resume_signal = 'RESUME'
+        self.reset_session()
+
+    def reset_session(self):
+        raise NotImplementedError
+
+    def feed(self, message):
+        raise NotImplementedError
+
+    def is_message_error(self, message):
+        return self.error_signal == message
+
+    @staticmethod
+    def validate_message_length(message, intended):
+        if len(message) != intended:
+            raise IndexError
+        if isinstance(message, str):
+            raise IndexError
+        for element in message:
+            if element is '' or element is False or element is None:
+                raise InvalidMessage
+
+
+@session_attributes(ClientSession)
+class ClientMachine(AbstractMachine):
+    def __init__(self, client_id=None, client_key=None, server_id=None, session_key=None, codec=None):
+        AbstractMachine.__init__(self)
+        self.ok_signal = 'OK'
+        self.codec = codec or string_codec
+        self.client_id = client_id
+        self.client_key = client_key
+        self.server_id = server_id
+        self.session_key = session_key
+
+    def reset_session(self):
+        self.session = ClientSession()
+
+    def begin(self):
+        if self.session_key is not None:
+            self.state = 'resuming'
+            return [(SERVER, self.prepare_resumption_for_server())]
+        return self.start_full_handshake()
+
+    def start_full_handshake(self):
+        self.state = 'handshaking'
+        return [(SERVER, self.prepare_message_for_server())]
+
+    def feed(self, message):
+        if self.state == 'resuming':
+            if self.process_resumption_from_server(message) == self.ok_signal:
+                return self.complete(self.ok_signal)
+            return self.start_full_handshake()
+        if self.state == 'handshaking':
+            return self.complete(self.process_message_from_server(message))
+        return []
+
+    def complete(self, response):
+        self.state = 'finished'
+        return [(RESULT, response)]
+
+    def prepare_resumption_for_server(self):
+        self.generate_and_save_nonce()
+        ticket = '{0}:{1}:{2}'.format(self.nonce, self.client_id, self.server_id)
+        return self.resume_signal, self.client_id, self.server_id, encrypt(ticket, int(self.session_key))
+
+    def process_resumption_from_server(self, message_from_server):
+        try:
+            self.validate_message_length(message_from_server, 2)
+            if message_from_server[0] != self.resume_signal:
+                raise InvalidMessage
+            self.trusted_nonce, server_id = \
+                parse_encrypted_fields(message_from_server[1], int(self.session_key), (str, str))
+            self.validate_nonce_from_trusted_server_matches()
+            if server_id != self.server_id:
+                raise InvalidMessage
+        except(IndexError, InvalidMessage, ValueError):
+            return self.error_signal
+        return self.ok_signal
+
+    def prepare_message_for_server(self):
+        self.generate_and_save_random_value()
+        self.generate_and_save_nonce()
+        return ClientRequest(self.random_value,
+                             self.client_id,
+                             self.server_id,
+                             self.generate_nested_message_for_trusted())
+
+    def generate_and_save_random_value(self):
+        self.random_value = generate_nonce()
+
+    def generate_nested_message_for_trusted(self):
+        ticket = InnerTicket(self.nonce, self.random_value, self.client_id, self.server_id)
+        return encrypt(self.codec.encode_inner(ticket), self.client_key)
+
+    def generate_and_save_nonce(self):
+        self.nonce = str(generate_nonce())
+
+    def process_message_from_server(self, message_from_server):
+        try:
+            self.unpack_message_from_server(message_from_server)
+            self.unpack_nested_message_from_trusted(message_from_server[1])
+            self.validate_nonce_from_trusted_server_matches()
+            self.validate_random_value()
+        except(IndexError, InvalidMessage, ValueError):
+            return self.error_signal
+        return self.ok_signal
+
+    def unpack_nested_message_from_trusted(self, encrypted_message):
+        self.trusted_nonce, self.session_key = self.codec.decode_session(decrypt(encrypted_message, self.client_key))
+
+    def validate_nonce_from_trusted_server_matches(self):
+        if self.trusted_nonce != self.nonce:
+            raise InvalidMessage
+
+    def unpack_message_from_server(self, message_from_server):
+        self.validate_message_length(message_from_server, 2)
+        response = ServerResponse._make(message_from_server)
+        self.server_random_value = int(response.random_value)
+        self.unpack_nested_message_from_trusted(response.client_ticket)
+
+    def validate_random_value(self):
+        if self.random_value != self.server_random_value:
+            raise InvalidMessage
+
+
+@session_attributes(ServerSession)
+class ServerWorkerMachine(AbstractMachine):
+    def __init__(self, server_id, server_key, session_cache=None, replay_detector=None, codec=None):
+        AbstractMachine.__init__(self)
+        self.codec = codec or string_codec
+        self.server_id = server_id
+        self.server_key = server_key
+        self.session_cache = session_cache
+        self.replay_detector = replay_detector
+
+    def reset_session(self):
+        self.session = ServerSession()
+
+    def feed(self, message):
+        if self.state == 'waiting_for_trusted':
+            return self.reply_to_client(self.create_response_for_client_from_message_from_trusted(message))
+        if self.state is not None:
+            return []
+        if self.is_resumption_message(message):
+            return self.reply_to_client(self.process_resumption_from_client(message))
+        message_to_trusted = self.process_message_from_client_and_generate_message_to_trusted(message)
+        if self.is_message_error(message_to_trusted):
+            return self.reply_to_client(self.error_signal)
+        self.state = 'waiting_for_trusted'
+        return [(TRUSTED, message_to_trusted)]
+
+    def reply_to_client(self, message):
+        self.state = 'finished'
+        return [(CLIENT, message)]
+
+    def process_message_from_client_and_generate_message_to_trusted(self, message):
+        try:
+            self.unpack_message_from_client(message)
+            self.validate_server_id_match()
+            return self.prepare_message_for_trusted_server(message)
+        except (IndexError, InvalidMessage, ValueError):
+            return self.error_signal
+
+    def unpack_message_from_client(self, message):
+        self.validate_message_length(message, 4)
+        request = ClientRequest._make(message)
+        self.client_random_value = int(request.random_value)
+        self.client_client_id = request.client_id
+        self.client_server_id = request.server_id
+
+    def validate_server_id_match(self):
+        if self.client_server_id != self.server_id:
+            raise InvalidMessage
+
+    def prepare_message_for_trusted_server(self, message):
+        return TrustedRequest._make(tuple(message) + (self.prepare_nested_message_for_trusted(),))
+
+    def prepare_nested_message_for_trusted(self):
+        self.nonce = str(generate_nonce())
+        ticket = InnerTicket(self.nonce, self.client_random_value, self.client_client_id, self.client_server_id)
+        return encrypt(self.codec.encode_inner(ticket), self.server_key)
+
+    def create_response_for_client_from_message_from_trusted(self, message):
+        try:
+            self.unpack_message_from_trusted(message)
+            self.validate_random_value_from_trusted()
+            self.validate_nested_message_from_trusted()
+        except(IndexError, InvalidMessage, ValueError):
+            return self.error_signal
+        self.remember_session()
+        return ServerResponse._make(message[:-1])
+
+    def remember_session(self):
+        if self.session_cache:
+            self.session_cache.store(self.client_client_id, self.session_key)
+
+    def is_resumption_message(self, message):
+        return isinstance(message, tuple) and len(message) == 4 and message[0] == self.resume_signal
+
+    def process_resumption_from_client(self, message):
+        try:
+            self.unpack_resumption_from_client(message)
+            self.validate_server_id_match()
+            self.validate_resumption_ticket(message[3])
+        except (IndexError, InvalidMessage, ValueError):
+            return self.error_signal
+        self.session_cache.record_resumption()
+        return self.resume_signal, encrypt('{0}:{1}'.format(self.nonce, self.server_id), int(self.session_key))
+
+    def unpack_resumption_from_client(self, message):
+        self.validate_message_length(message, 4)
+        self.client_client_id = message[1]
+        self.client_server_id = message[2]
+        if not self.session_cache:
+            raise InvalidMessage
+        self.session_key = self.session_cache.lookup(self.client_client_id)
+        if self.session_key is None:
+            raise InvalidMessage
+
+    def validate_resumption_ticket(self, encrypted_message):
+        self.nonce, client_id, server_id = \
+            parse_encrypted_fields(encrypted_message, int(self.session_key), (str, str, str))
+        if client_id != self.client_client_id or server_id != self.client_server_id:
+            raise InvalidMessage
+
+    def unpack_message_from_trusted(self, message):
+        self.validate_message_length(message, 3)
+        response = TrustedResponse._make(message)
+        self.trusted_random_value = int(response.random_value)
+        self.unpack_nested_message_from_trusted(response.server_ticket)
+
+    def unpack_nested_message_from_trusted(self, encrypted_message):
+        self.trusted_nonce, self.session_key = self.codec.decode_session(decrypt(encrypted_message, self.server_key))
+
+    def validate_nested_message_from_trusted(self):
+        if self.trusted_nonce != self.nonce:
+            raise InvalidMessage
+        if self.replay_detector and self.replay_detector.is_duplicate((self.client_client_id,
+                                                                       self.trusted_random_value)):
+            raise InvalidMessage
+
+    def validate_random_value_from_trusted(self):
+        if self.trusted_random_value != self.client_random_value:
+            raise InvalidMessage
+
+
+@session_attributes(TrustedSession)
+class TrustedMachine(AbstractMachine):
+    def __init__(self, keys, cipher_cache=None, replay_cache=None, codec=None):
+        AbstractMachine.__init__(self)
+        self.keys = keys
+        self.cipher_cache = cipher_cache or CipherContextCache(keys)
+        self.replay_cache = replay_cache
+        self.codec = codec or string_codec
+        self.batch_signal = 'BATCH'
+
+    def reset_session(self):
+        self.session = TrustedSession()
+
+    def feed(self, message):
+        return [(SERVER, self.answer(message))]
+
+    def answer(self, message):
+        if self.is_batch_message(message):
+            return self.process_batch_from_server(message[1])
+        return self.process_message_from_server_and_generate_answer(message)
+
+    def is_batch_message(self, message):
+        return isinstance(message, tuple) and len(message) == 2 and message[0] == self.batch_signal
+
+    def process_batch_from_server(self, messages):
+        if not isinstance(messages, (list, tuple)):
+            return self.error_signal
+        answers = []
+        for message in messages:
+            self.reset_session()
+            answers.append(self.process_message_from_server_and_generate_answer(message))
+        return answers
+
+    def process_message_from_server_and_generate_answer(self, message):
+        try:
+            self.unpack_message_from_server(message)
+            self.validate_nested_messages()
+            self.validate_not_replayed()
+        except (IndexError, InvalidMessage, ValueError):
+            return self.error_signal
+        return self.generate_response_for_server()
+
+    def validate_ids(self):
+        if not self.ids_are_valid([self.main_client_id, self.main_server_id]):
+            raise InvalidMessage
+
+    def generate_response_for_server(self):
+        self.session_key = generate_random_key()
+        return TrustedResponse(self.main_random_message,
+                               self.generate_nested_response_to_client(),
+                               self.generate_nested_response_to_server())
+
+    def generate_nested_response_to_client(self):
+        ticket = SessionTicket(self.client_nonce, self.session_key)
+        return self.encrypt_with_id(self.codec.encode_session(ticket), self.main_client_id)
+
+    def generate_nested_response_to_server(self):
+        ticket = SessionTicket(self.server_nonce, self.session_key)
+        return self.encrypt_with_id(self.codec.encode_session(ticket), self.main_server_id)
+
+    def decode_with_id(self, message, id_key):
+        return self.codec.decode_inner(self.cipher_cache.get(id_key).decrypt(message))
+
+    def encrypt_with_id(self, message, id_key):
+        return self.cipher_cache.get(id_key).encrypt(message)
+
+    def unpack_message_from_server(self, message):
+        self.validate_message_length(message, 5)
+        request = TrustedRequest._make(message)
+        self.main_random_message = int(request.random_value)
+        self.main_client_id = request.client_id
+        self.main_server_id = request.server_id
+        self.unpack_nested_messages(request)
+
+    def ids_are_valid(self, ids):
+        return all([identifier in self.keys for identifier in ids])
+
+    def unpack_nested_messages(self, request):
+        self.validate_ids()
+        self.unpack_client_nested_message(self.main_client_id, request.client_ticket)
+        self.unpack_server_nested_message(self.main_server_id, request.server_ticket)
+
+    def unpack_client_nested_message(self, client_id, message):
+        self.client_nonce, self.client_random_message, self.client_client_id, self.client_server_id = \
+            self.decode_with_id(message, client_id)
+
+    def unpack_server_nested_message(self, server_id, message):
+        self.server_nonce, self.server_random_message, self.server_client_id, self.server_server_id = \
+            self.decode_with_id(message, server_id)
+
+    def validate_nested_messages(self):
+        if not (self.client_id_matches()
+                and self.server_id_matches()
+                and self.random_message_matches()):
+            raise InvalidMessage
+
+    def validate_not_replayed(self):
+        if self.replay_cache and self.replay_cache.is_replay(self.main_client_id, self.main_server_id,
+                                                             self.client_nonce, self.server_nonce):
+            raise InvalidMessage
+
+    def client_id_matches(self):
+        return self.main_client_id == self.server_client_id == self.client_client_id
+
+    def server_id_matches(self):
+        return self.main_server_id == self.server_server_id == self.client_server_id
+
+    def random_message_matches(self):
+        return self.main_random_message == self.client_random_message == self.server_random_message
+
+
+def run_in_memory(client, server, trusted):
+    client.reset_session()
+    server.reset_session()
+    trusted.reset_session()
+    destination, message = client.begin()[0]
+    while destination != RESULT:
+        if destination == SERVER:
+            destination, message = server.feed(message)[0]
+        elif destination == TRUSTED:
+            destination, message = trusted.feed(message)[0]
+        else:
+            destination, message = client.feed(message)[0]
+    return message
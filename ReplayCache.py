@@ -0,0 +1,43 @@
+from collections import deque
+from threading import Lock
+from time import time
+
+
+class ReplayCache(object):
+    def __init__(self, window=60.0, buckets=6, clock=time):
+        self.bucket_span = float(window) / buckets
+        self.buckets = buckets
+        self.clock = clock
+        self.generations = deque()
+        self.lock = Lock()
+        self.accepted = 0
+        self.replays = 0
+        self.expired = 0
+
+    def is_replay(self, client_id, server_id, client_nonce, server_nonce):
+        key = (client_id, server_id, client_nonce, server_nonce)
+        with self.lock:
+            current = self.current_generation()
+            for _, seen in self.generations:
+                if key in seen:
+                    self.replays += 1
+                    return True
+            current.add(key)
+            self.accepted += 1
+            return False
+
+    def current_generation(self):
+        index = int(self.clock() // self.bucket_span)
+        while self.generations and self.generations[0][0] <= index - self.buckets:
+            self.expired += len(self.generations.popleft()[1])
+        if not self.generations or self.generations[-1][0] != index:
+            self.generations.append((index, set()))
+        return self.generations[-1][1]
+
+    def statistics(self):
+        with self.lock:
+            return {'accepted': self.accepted,
+                    'replays': self.replays,
+                    'expired': self.expired,
+                    'buckets': len(self.generations),
+                    'size': sum([len(seen) for _, seen in self.generations])}
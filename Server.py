@@ -1,7 +1,13 @@
-from Queue import Queue
-from threading import Thread
+from Queue import Queue, Empty, Full
+from threading import Thread, Event, Lock, Semaphore
+from time import time
 
-from Utils import prepare_inner_message, generate_random_key, decrypt
+from Instrumentation import disabled
+from Nonces import DuplicateDetector
+from SessionCache import SessionCache
+from Utils import InvalidMessage
+from Protocol import ServerWorkerMachine, TRUSTED
+from VirtualEndpoint import AbstractVirtualEndpoint, reply_queue_of
 
 
 class AbstractEntity(Thread):
@@ -9,24 +15,43 @@ class AbstractEntity(Thread):
         Thread.__init__(self)
         self.hello_signal = 'HELLO'
         self.error_signal = 'ERROR'
+        self.resume_signal = 'RESUME'
+        self.timeout_signal = 'TIMEOUT'
+        self.instrumentation = disabled
+        self.deadline = None
 
     def establish_connection(self, endpoint):
-        endpoint.input_queue.put(self.hello_signal)
-        return endpoint.output_queue.get()
+        started = self.instrumentation.start()
+        reply_queue = Queue()
+        endpoint.input_queue.put(self.hello_message(reply_queue))
+        connection = self.get_before_deadline(reply_queue)
+        self.instrumentation.stop('establish_connection', started)
+        if self.is_timeout(connection):
+            return self.error_signal
+        return connection
+
+    def hello_message(self, reply_queue):
+        return self.identified_hello(None, reply_queue)
+
+    def identified_hello(self, client_id, reply_queue):
+        if self.deadline is None:
+            return self.hello_signal, client_id, reply_queue
+        return self.hello_signal, client_id, reply_queue, self.deadline
+
+    def get_before_deadline(self, queue):
+        if self.deadline is None:
+            return queue.get()
+        try:
+            return queue.get(timeout=max(0.0, self.deadline - time()))
+        except Empty:
+            return self.timeout_signal
+
+    def is_timeout(self, message):
+        return message == self.timeout_signal
 
     def is_message_error(self, message):
         return self.error_signal == message
 
-    @staticmethod
-    def validate_message_length(message, intended):
-        if len(message) != intended:
-            raise IndexError
-        if isinstance(message, str):
-            raise IndexError
-        for element in message:
-            if element is '' or element is False or element is None:
-                raise InvalidMessage
-
 
 class AbstractQueueEntity(AbstractEntity):
     def __init__(self):
@@ -39,45 +64,209 @@ class AbstractStoppableEntity(AbstractQueueEntity):
     def __init__(self):
         AbstractQueueEntity.__init__(self)
         self.finish_signal = 'FINISH'
-        self.waiting_queues = []
+        self.finished = Event()
+        self.waiting_queues = set()
 
     def finish(self):
-        for waiting_queue in self.waiting_queues:
+        self.finished.set()
+        for waiting_queue in list(self.waiting_queues):
             waiting_queue.put(self.finish_signal)
 
     def is_finish_signal(self, message):
         return message == self.finish_signal
 
     def get_from_queue(self, queue):
-        self.waiting_queues.append(queue)
+        self.waiting_queues.add(queue)
+        if self.finished.is_set():
+            try:
+                return queue.get(block=False)
+            except Empty:
+                return self.finish_signal
         return queue.get()
 
 
 class AbstractServer(AbstractStoppableEntity):
-    def __init__(self, max_connections, invoke_workers):
+    def __init__(self, max_connections, invoke_workers, pool_workers=False, instrumentation=None,
+                 admission_timeout=None, per_client_limit=None, acceptors=1, session_timeout=None):
         AbstractStoppableEntity.__init__(self)
+        self.instrumentation = instrumentation or disabled
+        self.acceptors = acceptors
         self.max_connections = max_connections
         self.invoke_workers = invoke_workers
+        self.pool_workers = pool_workers
+        self.admission_timeout = admission_timeout
+        self.per_client_limit = per_client_limit
+        self.session_timeout = session_timeout
         self.workers = Queue(maxsize=max_connections)
+        self.ready_workers = Queue()
+        self.pool = []
+        self.connections_per_client = {}
+        self.admission_counters = {'admitted': 0, 'queued': 0, 'rejected': 0, 'timed_out': 0}
+        self.admission_lock = Lock()
         self.running = False
 
     def run(self):
         self.running = True
-        while self.running:
+        self.start_pool()
+        extra_acceptors = [Thread(target=self.accept_connections) for _ in range(self.acceptors - 1)]
+        for acceptor in extra_acceptors:
+            acceptor.start()
+        self.accept_connections()
+        for acceptor in extra_acceptors:
+            acceptor.join()
+        self.running = False
+        self.stop_pool()
+
+    def accept_connections(self):
+        while True:
             message = self.get_from_queue(self.input_queue)
             if self.is_finish_signal(message):
-                self.running = False
-            else:
-                self.output_queue.put(self.connect())
+                return
+            reply_queue_of(message, self.output_queue).put(self.connect(message))
 
-    def connect(self):
-        worker = self.get_new_worker()
-        self.workers.put(worker)
-        self.start_worker(worker)
+    def finish(self):
+        AbstractStoppableEntity.finish(self)
+        for _ in range(self.acceptors - 1):
+            self.input_queue.put(self.finish_signal)
+
+    def connect(self, hello=None):
+        client_id = self.connecting_client_id(hello)
+        deadline = self.connecting_deadline(hello)
+        if self.is_expired(deadline):
+            self.count_admission('timed_out')
+            return self.reject_connection()
+        if not self.reserve_client_slot(client_id):
+            return self.reject_connection()
+        started = self.instrumentation.start()
+        worker = self.acquire_worker(self.admission_wait(deadline))
+        self.instrumentation.stop('worker_slot_wait', started)
+        if worker is None:
+            self.release_client_slot(client_id)
+            return self.reject_connection()
+        worker.connection_owner = client_id
+        if self.is_expired(deadline):
+            self.count_admission('timed_out')
+            self.finish_worker(worker)
+            return self.reject_connection()
+        self.count_admission('admitted')
+        worker.deadline = self.session_deadline(deadline)
+        if self.pool_workers:
+            self.instrumentation.observe('workers_busy', self.max_connections - self.ready_workers.qsize())
+            worker.assign()
+        else:
+            self.instrumentation.observe('workers_busy', self.workers.qsize())
+            self.start_worker(worker)
         return worker.input_queue, worker.output_queue
 
+    @staticmethod
+    def connecting_client_id(hello):
+        if isinstance(hello, tuple) and len(hello) >= 2:
+            return hello[1]
+        return None
+
+    @staticmethod
+    def connecting_deadline(hello):
+        if isinstance(hello, tuple) and len(hello) == 4:
+            return hello[3]
+        return None
+
+    def session_deadline(self, deadline):
+        if self.session_timeout is None:
+            return deadline
+        local_deadline = time() + self.session_timeout
+        if deadline is None:
+            return local_deadline
+        return min(deadline, local_deadline)
+
+    @staticmethod
+    def is_expired(deadline):
+        return deadline is not None and deadline <= time()
+
+    def admission_wait(self, deadline):
+        if deadline is None:
+            return self.admission_timeout
+        remaining = max(0.0, deadline - time())
+        if self.admission_timeout is None:
+            return remaining
+        return min(self.admission_timeout, remaining)
+
+    def acquire_worker(self, timeout=None):
+        if self.pool_workers:
+            return self.take_ready_worker(timeout)
+        worker = self.create_worker()
+        if self.reserve_worker_slot(worker, timeout):
+            return worker
+        return None
+
+    def take_ready_worker(self, timeout=None):
+        try:
+            return self.ready_workers.get(block=False)
+        except Empty:
+            self.count_admission('queued')
+        try:
+            return self.ready_workers.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def reserve_worker_slot(self, worker, timeout=None):
+        try:
+            self.workers.put(worker, block=False)
+            return True
+        except Full:
+            self.count_admission('queued')
+        try:
+            self.workers.put(worker, timeout=timeout)
+            return True
+        except Full:
+            return False
+
+    def reserve_client_slot(self, client_id):
+        if client_id is None or not self.per_client_limit:
+            return True
+        with self.admission_lock:
+            connections = self.connections_per_client.get(client_id, 0)
+            if connections >= self.per_client_limit:
+                return False
+            self.connections_per_client[client_id] = connections + 1
+        return True
+
+    def release_client_slot(self, client_id):
+        if client_id is None or not self.per_client_limit:
+            return
+        with self.admission_lock:
+            connections = self.connections_per_client.pop(client_id, 0) - 1
+            if connections > 0:
+                self.connections_per_client[client_id] = connections
+
+    def reject_connection(self):
+        self.count_admission('rejected')
+        return self.error_signal
+
+    def count_admission(self, outcome):
+        with self.admission_lock:
+            self.admission_counters[outcome] += 1
+
+    def admission_statistics(self):
+        with self.admission_lock:
+            return dict(self.admission_counters)
+
+    def start_pool(self):
+        if not self.pool_workers or self.pool:
+            return
+        for _ in range(self.max_connections):
+            worker = self.create_worker()
+            self.pool.append(worker)
+            self.ready_workers.put(worker)
+            self.start_worker(worker)
+
+    def stop_pool(self):
+        for worker in self.pool:
+            worker.jobs.put(self.finish_signal)
+
     def create_worker(self):
-        return self.get_new_worker()
+        worker = self.get_new_worker()
+        worker.instrumentation = self.instrumentation
+        return worker
 
     def get_new_worker(self):
         raise NotImplementedError
@@ -86,117 +275,347 @@ class AbstractServer(AbstractStoppableEntity):
         if self.invoke_workers:
             worker.start()
 
-    def finish_worker(self):
-        self.workers.get()
+    def finish_worker(self, worker=None):
+        self.release_client_slot(getattr(worker, 'connection_owner', None))
+        if self.pool_workers:
+            self.ready_workers.put(worker)
+        else:
+            self.workers.get()
+
+
+class AbstractWorker(AbstractQueueEntity):
+    def __init__(self, parent_server=None, pooled=False):
+        AbstractQueueEntity.__init__(self)
+        self.parent_server = parent_server
+        self.pooled = pooled
+        self.connection_owner = None
+        self.jobs = Queue()
+        self.finish_signal = 'FINISH'
+        self.reset_session()
+
+    def run(self):
+        if not self.pooled:
+            self.handle_session()
+            self.signal_parent()
+            return
+        while not self.is_finish_signal(self.jobs.get()):
+            self.handle_session()
+            self.reset_queues()
+            self.reset_session()
+            self.signal_parent()
+
+    def assign(self):
+        self.jobs.put(self.hello_signal)
+
+    def is_finish_signal(self, message):
+        return message == self.finish_signal
+
+    def reset_queues(self):
+        self.input_queue = Queue()
+        self.output_queue = Queue()
+
+    def handle_session(self):
+        raise NotImplementedError
+
+    def reset_session(self):
+        raise NotImplementedError
+
+    def signal_parent(self):
+        if self.parent_server:
+            self.parent_server.finish_worker(self)
+
+    def record_timeout(self):
+        if self.parent_server:
+            self.parent_server.count_admission('timed_out')
 
 
 class Server(AbstractServer):
-    def __init__(self, server_id, server_key, max_connections, trusted_server, invoke_workers=True):
-        AbstractServer.__init__(self, max_connections, invoke_workers)
+    def __init__(self, server_id, server_key, max_connections, trusted_server, invoke_workers=True,
+                 pool_workers=False, batch_size=None, batch_delay=0.005, session_cache_size=None,
+                 session_ttl=60.0, instrumentation=None, admission_timeout=None, per_client_limit=None,
+                 acceptors=1, replay_capacity=None, trusted_channels=None, channel_depth=16, codec=None,
+                 session_timeout=None):
+        AbstractServer.__init__(self, max_connections, invoke_workers, pool_workers, instrumentation,
+                                admission_timeout, per_client_limit, acceptors, session_timeout)
         self.server_id = server_id
         self.server_key = server_key
         self.trusted_server = trusted_server
+        self.codec = codec
+        self.batcher = None
+        self.channel_pool = None
+        self.trusted_endpoint = trusted_server
+        if trusted_channels:
+            self.channel_pool = TrustedChannelPool(trusted_server, trusted_channels, channel_depth)
+            self.trusted_endpoint = self.channel_pool
+        if batch_size:
+            self.batcher = TrustedServerBatcher(self.trusted_endpoint, batch_size, batch_delay, session_timeout)
+            self.trusted_endpoint = self.batcher
+        self.session_cache = None
+        if session_cache_size:
+            self.session_cache = SessionCache(session_ttl, session_cache_size)
+        self.replay_detector = None
+        if replay_capacity:
+            self.replay_detector = DuplicateDetector(replay_capacity)
+
+    def run(self):
+        if self.channel_pool:
+            self.channel_pool.open()
+        if self.batcher:
+            self.batcher.start()
+        AbstractServer.run(self)
+        if self.batcher:
+            self.batcher.finish()
+            self.batcher.join()
+        if self.channel_pool:
+            self.channel_pool.close()
 
     def get_new_worker(self):
-        return ServerWorker(self.server_id, self.server_key, self.trusted_server, self)
+        return ServerWorker(self.server_id, self.server_key, self.trusted_endpoint, self, self.pool_workers,
+                            self.session_cache, self.replay_detector, self.codec)
 
 
-class ServerWorker(AbstractQueueEntity):
-    def __init__(self, server_id, server_key, trusted_server, parent_server=None):
-        AbstractQueueEntity.__init__(self)
-        self.server_key = server_key
-        self.server_id = server_id
+class ServerWorker(ServerWorkerMachine, AbstractWorker):
+    def __init__(self, server_id, server_key, trusted_server, parent_server=None, pooled=False, session_cache=None,
+                 replay_detector=None, codec=None):
+        AbstractWorker.__init__(self, parent_server, pooled)
+        ServerWorkerMachine.__init__(self, server_id, server_key, session_cache, replay_detector, codec)
         self.trusted_server = trusted_server
-        self.trusted_server_input_queue = None
-        self.trusted_server_output_queue = None
-        self.trusted_random_value = None
-        self.client_random_value = None
-        self.client_client_id = None
-        self.client_server_id = None
-        self.trusted_nonce = None
-        self.session_key = None
-        self.nonce = None
-        self.parent_server = parent_server
 
-    def run(self):
-        message_from_client = self.input_queue.get()
-        message_to_trusted = \
-            self.process_message_from_client_and_generate_message_to_trusted(message_from_client)
-        if self.is_message_error(message_to_trusted):
-            self.output_queue.put(self.error_signal)
-        else:
-            self.connect_to_trusted()
-            self.trusted_server_input_queue.put(message_to_trusted)
-            message_from_trusted = self.trusted_server_output_queue.get()
-            message_for_client = self.create_response_for_client_from_message_from_trusted(message_from_trusted)
-            self.output_queue.put(message_for_client)
-        self.signal_parent()
-
-    def process_message_from_client_and_generate_message_to_trusted(self, message):
-        try:
-            self.unpack_message_from_client(message)
-            self.validate_server_id_match()
-        except (IndexError, InvalidMessage, ValueError):
+    def handle_session(self):
+        started = self.instrumentation.start()
+        message_from_client = self.get_before_deadline(self.input_queue)
+        self.instrumentation.stop('server_wait_for_client', started)
+        if self.is_timeout(message_from_client):
+            self.record_timeout()
+            return
+        started = self.instrumentation.start()
+        destination, message = self.feed(message_from_client)[0]
+        self.instrumentation.stop('server_process_client', started)
+        if destination == TRUSTED:
+            message_from_trusted = self.exchange_with_trusted(message)
+            started = self.instrumentation.start()
+            destination, message = self.feed(message_from_trusted)[0]
+            self.instrumentation.stop('server_process_trusted', started)
+        self.output_queue.put(message)
+
+    def exchange_with_trusted(self, message):
+        if not self.connect_to_trusted():
             return self.error_signal
-        return self.prepare_message_for_trusted_server(message)
-
-    def unpack_message_from_client(self, message):
-        self.validate_message_length(message, 4)
-        self.client_random_value = int(message[0])
-        self.client_client_id = message[1]
-        self.client_server_id = message[2]
-
-    def validate_server_id_match(self):
-        if self.client_server_id != self.server_id:
-            raise InvalidMessage
-
-    def prepare_message_for_trusted_server(self, message):
-        return message + (self.prepare_nested_message_for_trusted(),)
-
-    def prepare_nested_message_for_trusted(self):
-        self.nonce = str(generate_random_key())
-        return prepare_inner_message(self.server_key,
-                                     self.nonce,
-                                     self.client_random_value,
-                                     self.client_client_id,
-                                     self.client_server_id)
-
-    def create_response_for_client_from_message_from_trusted(self, message):
-        try:
-            self.unpack_message_from_trusted(message)
-            self.validate_random_value_from_trusted()
-            self.validate_nested_message_from_trusted()
-        except(IndexError, InvalidMessage, ValueError):
+        started = self.instrumentation.start()
+        self.trusted_server_input_queue.put(message)
+        message_from_trusted = self.get_before_deadline(self.trusted_server_output_queue)
+        self.instrumentation.stop('server_trusted_roundtrip', started)
+        if self.is_timeout(message_from_trusted):
+            self.record_timeout()
+            self.cancel_trusted_session()
             return self.error_signal
-        return message[:-1]
+        return message_from_trusted
 
-    def unpack_message_from_trusted(self, message):
-        self.validate_message_length(message, 3)
-        self.trusted_random_value = int(message[0])
-        self.unpack_nested_message_from_trusted(message[2])
+    def connect_to_trusted(self):
+        connection = self.establish_connection(self.trusted_server)
+        if self.is_message_error(connection):
+            return False
+        self.trusted_server_input_queue, self.trusted_server_output_queue = connection
+        return True
 
-    def unpack_nested_message_from_trusted(self, encrypted_message):
-        decrypted = decrypt(encrypted_message, self.server_key).split(':')
-        self.validate_message_length(decrypted, 2)
-        self.trusted_nonce, self.session_key = decrypted
+    def cancel_trusted_session(self):
+        cancel = getattr(self.trusted_server_input_queue, 'cancel', None)
+        if cancel:
+            cancel()
 
-    def validate_nested_message_from_trusted(self):
-        if self.trusted_nonce != self.nonce:
-            raise InvalidMessage
 
-    def connect_to_trusted(self):
-        self.trusted_server_input_queue, self.trusted_server_output_queue = \
-            self.establish_connection(self.trusted_server)
+class TrustedServerBatcher(AbstractEntity, AbstractVirtualEndpoint):
+    def __init__(self, trusted_server, batch_size, max_delay, timeout=None):
+        AbstractEntity.__init__(self)
+        AbstractVirtualEndpoint.__init__(self)
+        self.daemon = True
+        self.trusted_server = trusted_server
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.batch_signal = 'BATCH'
+        self.finish_signal = 'FINISH'
+        self.pending = Queue()
+        self.batches_sent = 0
+        self.messages_sent = 0
 
-    def validate_random_value_from_trusted(self):
-        if self.trusted_random_value != self.client_random_value:
-            raise InvalidMessage
+    def send(self, session_id, message):
+        self.pending.put((session_id, message))
 
-    def signal_parent(self):
-        if self.parent_server:
-            self.parent_server.finish_worker()
+    def finish(self):
+        self.pending.put(self.finish_signal)
 
+    def run(self):
+        running = True
+        while running:
+            first = self.pending.get()
+            if first == self.finish_signal:
+                break
+            batch = [first]
+            deadline = time() + self.max_delay
+            while len(batch) < self.batch_size:
+                item = self.get_pending_before(deadline)
+                if item is None:
+                    break
+                if item == self.finish_signal:
+                    running = False
+                    break
+                batch.append(item)
+            self.dispatch(batch)
+
+    def get_pending_before(self, deadline):
+        remaining = deadline - time()
+        if remaining <= 0:
+            return None
+        try:
+            return self.pending.get(timeout=remaining)
+        except Empty:
+            return None
+
+    def dispatch(self, batch):
+        answers = self.error_signal
+        if self.timeout is not None:
+            self.deadline = time() + self.timeout
+        connection = self.establish_connection(self.trusted_server)
+        if not self.is_message_error(connection):
+            trusted_input, trusted_output = connection
+            trusted_input.put((self.batch_signal, [message for _, message in batch]))
+            answers = self.get_before_deadline(trusted_output)
+        self.batches_sent += 1
+        self.messages_sent += len(batch)
+        if not isinstance(answers, list) or len(answers) != len(batch):
+            answers = [self.error_signal] * len(batch)
+        for (session_id, _), answer in zip(batch, answers):
+            self.deliver(session_id, answer)
+
+
+class TrustedChannel(AbstractEntity):
+    def __init__(self, trusted_server, depth, pool, acknowledgement_timeout=1.0):
+        AbstractEntity.__init__(self)
+        self.daemon = True
+        self.trusted_server = trusted_server
+        self.depth = depth
+        self.pool = pool
+        self.acknowledgement_timeout = acknowledgement_timeout
+        self.channel_signal = 'CHANNEL'
+        self.slots = Semaphore(depth)
+        self.pending = set()
+        self.in_flight = 0
+        self.requests = 0
+
+    def open(self):
+        connection = self.establish_connection(self.trusted_server)
+        if self.is_message_error(connection):
+            return False
+        self.trusted_input, self.trusted_output = connection
+        self.trusted_input.put((self.channel_signal,))
+        if not self.is_acknowledged():
+            self.close()
+            return False
+        self.start()
+        return True
+
+    def is_acknowledged(self):
+        try:
+            return self.trusted_output.get(timeout=self.acknowledgement_timeout) == (self.channel_signal,)
+        except Empty:
+            return False
 
-class InvalidMessage(Exception):
-    def __init__(self):
-        Exception.__init__(self)
+    def send(self, correlation_id, message):
+        self.slots.acquire()
+        self.pending.add(correlation_id)
+        self.trusted_input.put((correlation_id, message))
+
+    def close(self):
+        self.trusted_input.put(None)
+
+    def run(self):
+        while True:
+            response = self.trusted_output.get()
+            if not isinstance(response, tuple) or len(response) != 2:
+                self.pool.channel_closed(self)
+                return
+            correlation_id, answer = response
+            self.pending.discard(correlation_id)
+            self.slots.release()
+            self.pool.complete(self, correlation_id, answer)
+
+
+class TrustedChannelPool(AbstractVirtualEndpoint):
+    def __init__(self, trusted_server, size, depth):
+        AbstractVirtualEndpoint.__init__(self)
+        self.trusted_server = trusted_server
+        self.size = size
+        self.depth = depth
+        self.channels = []
+        self.lock = Lock()
+        self.requests = 0
+        self.occupancy = 0
+        self.peak_in_flight = 0
+
+    def open(self):
+        if not getattr(self.trusted_server, 'accepts_channels', False):
+            return
+        for _ in range(self.size):
+            channel = TrustedChannel(self.trusted_server, self.depth, self)
+            if channel.open():
+                self.channels.append(channel)
+
+    def close(self):
+        for channel in list(self.channels):
+            channel.close()
+        for channel in list(self.channels):
+            channel.join()
+
+    def accept_hello(self, hello_message):
+        if not self.channels:
+            self.trusted_server.input_queue.put(hello_message)
+            return
+        AbstractVirtualEndpoint.accept_hello(self, hello_message)
+
+    def send(self, session_id, message):
+        channel = self.choose_channel()
+        if channel is None:
+            self.deliver(session_id, self.error_signal)
+            return
+        channel.send(session_id, message)
+
+    def choose_channel(self):
+        with self.lock:
+            if not self.channels:
+                return None
+            channel = min(self.channels, key=lambda candidate: candidate.in_flight)
+            channel.in_flight += 1
+            channel.requests += 1
+            self.requests += 1
+            in_flight = sum([candidate.in_flight for candidate in self.channels])
+            self.occupancy += in_flight
+            self.peak_in_flight = max(self.peak_in_flight, in_flight)
+            return channel
+
+    def complete(self, channel, correlation_id, answer):
+        with self.lock:
+            channel.in_flight -= 1
+        self.deliver(correlation_id, answer)
+
+    def channel_closed(self, channel):
+        with self.lock:
+            if channel in self.channels:
+                self.channels.remove(channel)
+            closed = not self.channels
+        for correlation_id in list(channel.pending):
+            self.deliver(correlation_id, self.error_signal)
+        if closed:
+            self.fail_open_sessions()
+
+    def statistics(self):
+        with self.lock:
+            capacity = len(self.channels) * self.depth
+            return {'channels': len(self.channels),
+                    'depth': self.depth,
+                    'requests': self.requests,
+                    'in_flight': sum([channel.in_flight for channel in self.channels]),
+                    'peak_in_flight': self.peak_in_flight,
+                    'utilization': float(self.occupancy) / (self.requests * capacity)
+                    if self.requests and capacity else 0.0,
+                    'requests_per_channel': [channel.requests for channel in self.channels]}
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+from threading import Lock
+from time import time
+
+
+class SessionCache(object):
+    def __init__(self, ttl=60.0, max_size=1024, clock=time):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.stored = 0
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.trusted_server_avoided = 0
+
+    def store(self, client_id, session_key):
+        with self.lock:
+            self.entries.pop(client_id, None)
+            while self.max_size and len(self.entries) >= self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self.entries[client_id] = (session_key, self.clock() + self.ttl)
+            self.stored += 1
+
+    def lookup(self, client_id):
+        with self.lock:
+            entry = self.entries.get(client_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            session_key, expires = entry
+            if expires <= self.clock():
+                del self.entries[client_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.hits += 1
+            return session_key
+
+    def record_resumption(self):
+        with self.lock:
+            self.trusted_server_avoided += 1
+
+    def statistics(self):
+        with self.lock:
+            return {'stored': self.stored,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'expirations': self.expirations,
+                    'evictions': self.evictions,
+                    'trusted_server_avoided': self.trusted_server_avoided,
+                    'size': len(self.entries)}
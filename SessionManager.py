@@ -0,0 +1,124 @@
+from Queue import Queue
+from threading import Thread, Event, Lock
+
+from Client import Client
+
+
+class SessionFuture(object):
+    def __init__(self, client_id, server_id):
+        self.client_id = client_id
+        self.server_id = server_id
+        self.session_key = None
+        self.error = None
+        self.completed = Event()
+        self.callbacks = []
+        self.callback_errors = []
+        self.lock = Lock()
+
+    def resolve(self, session_key):
+        with self.lock:
+            self.session_key = session_key
+            self.completed.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            self.run_callback(callback)
+
+    def add_done_callback(self, callback):
+        with self.lock:
+            if not self.completed.is_set():
+                self.callbacks.append(callback)
+                return
+        self.run_callback(callback)
+
+    def run_callback(self, callback):
+        try:
+            callback(self)
+        except Exception as error:
+            self.callback_errors.append(error)
+
+    def done(self):
+        return self.completed.is_set()
+
+    def result(self, timeout=None):
+        self.completed.wait(timeout)
+        return self.session_key
+
+    def failed(self):
+        return self.done() and self.session_key is None
+
+
+class ClientSessionManager(object):
+    def __init__(self, directory=None, workers=8, resume=True, timeout=None):
+        self.directory = dict(directory or {})
+        self.resume = resume
+        self.timeout = timeout
+        self.requests = Queue()
+        self.session_keys = {}
+        self.lock = Lock()
+        self.completed = 0
+        self.failed = 0
+        self.threads = [Thread(target=self.serve_requests) for _ in range(workers)]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def register(self, server_id, server):
+        self.directory[server_id] = server
+
+    def request_session(self, client_id, client_key, server_id, callback=None):
+        future = SessionFuture(client_id, server_id)
+        if callback:
+            future.add_done_callback(callback)
+        server = self.directory.get(server_id)
+        if server is None:
+            self.record(future, None)
+        else:
+            self.requests.put((future, client_key, server))
+        return future
+
+    def serve_requests(self):
+        client = Client(timeout=self.timeout)
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            future, client_key, server = request
+            self.record(future, self.establish(client, future, client_key, server))
+
+    def establish(self, client, future, client_key, server):
+        try:
+            client.assign(future.client_id, client_key, server, future.server_id, self.known_session_key(future))
+            if client.handshake() == client.ok_signal:
+                return client.session_key
+        except Exception as error:
+            future.error = error
+        return None
+
+    def known_session_key(self, future):
+        if not self.resume:
+            return None
+        with self.lock:
+            return self.session_keys.get((future.client_id, future.server_id))
+
+    def record(self, future, session_key):
+        with self.lock:
+            if session_key is None:
+                self.failed += 1
+                self.session_keys.pop((future.client_id, future.server_id), None)
+            else:
+                self.completed += 1
+                self.session_keys[(future.client_id, future.server_id)] = session_key
+        future.resolve(session_key)
+
+    def close(self):
+        for _ in self.threads:
+            self.requests.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def statistics(self):
+        with self.lock:
+            return {'completed': self.completed,
+                    'failed': self.failed,
+                    'pending': self.requests.qsize(),
+                    'known_sessions': len(self.session_keys)}
@@ -0,0 +1,66 @@
+class AbstractSession(object):
+    __slots__ = ()
+
+    def __init__(self):
+        for name in self.__slots__:
+            setattr(self, name, None)
+
+
+class ClientSession(AbstractSession):
+    __slots__ = ('state',
+                 'server_worker_input',
+                 'server_worker_output',
+                 'random_value',
+                 'nonce',
+                 'server_random_value',
+                 'session_key',
+                 'trusted_nonce')
+
+
+class ServerSession(AbstractSession):
+    __slots__ = ('state',
+                 'trusted_server_input_queue',
+                 'trusted_server_output_queue',
+                 'trusted_random_value',
+                 'client_random_value',
+                 'client_client_id',
+                 'client_server_id',
+                 'trusted_nonce',
+                 'session_key',
+                 'nonce')
+
+
+class TrustedSession(AbstractSession):
+    __slots__ = ('main_random_message',
+                 'main_client_id',
+                 'main_server_id',
+                 'client_random_message',
+                 'client_client_id',
+                 'client_server_id',
+                 'server_random_message',
+                 'server_client_id',
+                 'server_server_id',
+                 'client_nonce',
+                 'server_nonce',
+                 'client_key',
+                 'server_key',
+                 'session_key')
+
+
+def session_attribute(name):
+    def get(entity):
+        return getattr(entity.session, name)
+
+    def set(entity, value):
+        setattr(entity.session, name, value)
+
+    return property(get, set)
+
+
+def session_attributes(session_class):
+    def decorate(entity_class):
+        for name in session_class.__slots__:
+            setattr(entity_class, name, session_attribute(name))
+        return entity_class
+
+    return decorate
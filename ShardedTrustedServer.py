@@ -0,0 +1,148 @@
+import zlib
+from Queue import Queue
+from itertools import count
+from multiprocessing import Process, Queue as ProcessQueue
+from threading import Thread, Lock
+
+from Server import AbstractServer, AbstractWorker
+from TrustedServer import TrustedServerWorker
+
+
+def shard_for(identifier, shards):
+    return (zlib.crc32(str(identifier)) & 0xffffffff) % shards
+
+
+def serve_shard(keys, requests, responses, codec=None):
+    worker = TrustedServerWorker(keys, codec=codec)
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, message = request
+        worker.reset_session()
+        responses.put((request_id, worker.answer(message)))
+    responses.put(None)
+
+
+class TrustedServerShard(object):
+    def __init__(self, keys, codec=None):
+        self.keys = keys
+        self.requests = ProcessQueue()
+        self.responses = ProcessQueue()
+        self.process = Process(target=serve_shard, args=(keys, self.requests, self.responses, codec))
+        self.process.daemon = True
+        self.collector = Thread(target=self.collect_responses)
+        self.collector.daemon = True
+        self.request_ids = count()
+        self.pending = {}
+        self.lock = Lock()
+
+    def start(self):
+        self.process.start()
+        self.collector.start()
+
+    def stop(self):
+        self.requests.put(None)
+
+    def submit(self, message):
+        reply = Queue()
+        with self.lock:
+            request_id = next(self.request_ids)
+            self.pending[request_id] = reply
+        self.requests.put((request_id, message))
+        return reply
+
+    def collect_responses(self):
+        while True:
+            response = self.responses.get()
+            if response is None:
+                return
+            request_id, answer = response
+            with self.lock:
+                reply = self.pending.pop(request_id)
+            reply.put(answer)
+
+
+class ShardedTrustedServer(AbstractServer):
+    def __init__(self, keys, max_connections, shards, server_ids, invoke_workers=True, pool_workers=False,
+                 session_timeout=None, codec=None):
+        if not server_ids:
+            raise ValueError('every shard needs the keys of the servers, pass their server_ids')
+        AbstractServer.__init__(self, max_connections, invoke_workers, pool_workers, session_timeout=session_timeout)
+        self.keys = keys
+        self.server_ids = set(server_ids)
+        self.shards = [TrustedServerShard(self.slice_keys(number, shards), codec) for number in range(shards)]
+
+    def slice_keys(self, number, shards):
+        return dict((identifier, key) for identifier, key in self.keys.items()
+                    if identifier in self.server_ids or shard_for(identifier, shards) == number)
+
+    def start(self):
+        for shard in self.shards:
+            shard.start()
+        AbstractServer.start(self)
+
+    def run(self):
+        AbstractServer.run(self)
+        for shard in self.shards:
+            shard.stop()
+
+    def get_new_worker(self):
+        return ShardDispatchWorker(self, self.pool_workers)
+
+    def shard_for_client(self, client_id):
+        return self.shards[shard_for(client_id, len(self.shards))]
+
+
+class ShardDispatchWorker(AbstractWorker):
+    def __init__(self, parent_server, pooled=False):
+        AbstractWorker.__init__(self, parent_server, pooled)
+        self.batch_signal = 'BATCH'
+
+    def reset_session(self):
+        pass
+
+    def handle_session(self):
+        message_from_server = self.get_before_deadline(self.input_queue)
+        if self.is_timeout(message_from_server):
+            self.record_timeout()
+            return
+        self.output_queue.put(self.dispatch(message_from_server))
+
+    def dispatch(self, message):
+        if self.is_batch_message(message):
+            return self.dispatch_batch(message[1])
+        try:
+            shard = self.parent_server.shard_for_client(message[1])
+        except (IndexError, TypeError, KeyError):
+            return self.error_signal
+        answer = self.get_before_deadline(shard.submit(message))
+        if self.is_timeout(answer):
+            self.record_timeout()
+            return self.error_signal
+        return answer
+
+    def is_batch_message(self, message):
+        return isinstance(message, tuple) and len(message) == 2 and message[0] == self.batch_signal
+
+    def dispatch_batch(self, messages):
+        if not isinstance(messages, (list, tuple)):
+            return self.error_signal
+        items_by_shard = {}
+        answers = [self.error_signal] * len(messages)
+        for position, message in enumerate(messages):
+            try:
+                shard = self.parent_server.shard_for_client(message[1])
+            except (IndexError, TypeError, KeyError):
+                continue
+            items_by_shard.setdefault(shard, []).append(position)
+        replies = [(positions, shard.submit((self.batch_signal, [messages[position] for position in positions])))
+                   for shard, positions in items_by_shard.items()]
+        for positions, reply in replies:
+            shard_answers = self.get_before_deadline(reply)
+            if self.is_timeout(shard_answers):
+                self.record_timeout()
+                continue
+            for position, answer in zip(positions, shard_answers):
+                answers[position] = answer
+        return answers
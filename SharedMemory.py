@@ -0,0 +1,135 @@
+import mmap
+import struct
+from multiprocessing import Process, Semaphore
+from threading import Thread, Lock
+
+from TrustedServer import TrustedServerWorker
+from Transport import WireFormatError
+from VirtualEndpoint import AbstractVirtualEndpoint
+
+STOP, SIGNAL, REQUEST, RESPONSE = range(4)
+
+index_field = struct.Struct('!I')
+slot_header = struct.Struct('!IBq')
+field_lengths = {STOP: struct.Struct('!'),
+                 SIGNAL: struct.Struct('!H'),
+                 REQUEST: struct.Struct('!4H'),
+                 RESPONSE: struct.Struct('!2H')}
+
+
+def classify(message):
+    if message is None:
+        return STOP, 0, ()
+    if isinstance(message, str):
+        return SIGNAL, 0, (message,)
+    if isinstance(message, tuple) and len(message) in (3, 5):
+        number, fields = message[0], message[1:]
+        if isinstance(number, (int, long)) and not isinstance(number, bool) \
+                and all([isinstance(field, str) for field in fields]):
+            return (REQUEST if len(message) == 5 else RESPONSE), number, fields
+    raise WireFormatError
+
+
+def encode_slot(session_id, kind, number, fields):
+    try:
+        header = slot_header.pack(session_id, kind, number)
+        lengths = field_lengths[kind].pack(*[len(field) for field in fields])
+    except struct.error:
+        raise WireFormatError
+    return header + lengths + ''.join(fields)
+
+
+def read_slot(memory, offset):
+    session_id, kind, number = slot_header.unpack_from(memory, offset)
+    offset += slot_header.size
+    lengths = field_lengths[kind].unpack_from(memory, offset)
+    offset += field_lengths[kind].size
+    fields = []
+    for length in lengths:
+        fields.append(memory[offset:offset + length])
+        offset += length
+    if kind == STOP:
+        return session_id, None
+    if kind == SIGNAL:
+        return session_id, fields[0]
+    return session_id, (number,) + tuple(fields)
+
+
+class SharedRing(object):
+    def __init__(self, slots=256, slot_size=4096):
+        self.slots = slots
+        self.slot_size = slot_size
+        self.memory = mmap.mmap(-1, 2 * index_field.size + slots * slot_size)
+        self.free = Semaphore(slots)
+        self.filled = Semaphore(0)
+        self.write_lock = Lock()
+        self.read_lock = Lock()
+
+    def put(self, session_id, message):
+        slot = encode_slot(session_id, *classify(message))
+        if len(slot) > self.slot_size:
+            raise WireFormatError
+        self.free.acquire()
+        with self.write_lock:
+            offset = self.advance(0)
+            self.memory[offset:offset + len(slot)] = slot
+        self.filled.release()
+
+    def get(self):
+        self.filled.acquire()
+        with self.read_lock:
+            frame = read_slot(self.memory, self.advance(1))
+        self.free.release()
+        return frame
+
+    def advance(self, position):
+        index, = index_field.unpack_from(self.memory, position * index_field.size)
+        index_field.pack_into(self.memory, position * index_field.size, (index + 1) % self.slots)
+        return 2 * index_field.size + index * self.slot_size
+
+
+def serve_shared_memory(keys, requests, responses, codec=None):
+    worker = TrustedServerWorker(keys, codec=codec)
+    while True:
+        session_id, message = requests.get()
+        if message is None:
+            break
+        worker.reset_session()
+        responses.put(session_id, worker.answer(message))
+    responses.put(0, None)
+
+
+class SharedMemoryTrustedServer(AbstractVirtualEndpoint):
+    def __init__(self, keys, slots=256, slot_size=4096, codec=None):
+        AbstractVirtualEndpoint.__init__(self)
+        self.requests = SharedRing(slots, slot_size)
+        self.responses = SharedRing(slots, slot_size)
+        self.process = Process(target=serve_shared_memory, args=(keys, self.requests, self.responses, codec))
+        self.process.daemon = True
+        self.collector = Thread(target=self.collect_responses)
+        self.collector.daemon = True
+
+    def start(self):
+        self.process.start()
+        self.collector.start()
+
+    def finish(self):
+        self.requests.put(0, None)
+
+    def join(self, timeout=None):
+        self.process.join(timeout)
+        self.collector.join(timeout)
+
+    def send(self, session_id, message):
+        try:
+            self.requests.put(session_id, message)
+        except WireFormatError:
+            self.deliver(session_id, self.error_signal)
+
+    def collect_responses(self):
+        while True:
+            session_id, message = self.responses.get()
+            if message is None:
+                self.fail_open_sessions()
+                return
+            self.deliver(session_id, message)
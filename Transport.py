@@ -0,0 +1,221 @@
+import socket
+import struct
+from threading import Thread, Lock
+
+from Server import AbstractEntity
+from VirtualEndpoint import AbstractVirtualEndpoint
+
+frame_header = struct.Struct('!II')
+count_field = struct.Struct('!H')
+length_field = struct.Struct('!I')
+integer_field = struct.Struct('!q')
+max_frame_size = 1 << 20
+max_nesting = 32
+
+
+class WireFormatError(Exception):
+    def __init__(self):
+        Exception.__init__(self)
+
+
+def encode_frame(session_id, message):
+    parts = []
+    try:
+        encode_value(message, parts)
+        payload = ''.join(parts)
+        return frame_header.pack(len(payload), session_id) + payload
+    except struct.error:
+        raise WireFormatError
+
+
+def encode_value(value, parts):
+    if isinstance(value, (tuple, list)):
+        parts.append('T' if isinstance(value, tuple) else 'L')
+        parts.append(count_field.pack(len(value)))
+        for element in value:
+            encode_value(element, parts)
+    elif isinstance(value, str):
+        parts.append('S')
+        parts.append(length_field.pack(len(value)))
+        parts.append(value)
+    elif isinstance(value, (int, long)) and not isinstance(value, bool):
+        parts.append('I')
+        parts.append(integer_field.pack(value))
+    elif value is None:
+        parts.append('N')
+    else:
+        raise WireFormatError
+
+
+def decode_payload(payload):
+    value, offset = decode_value(payload, 0)
+    if offset != len(payload):
+        raise WireFormatError
+    return value
+
+
+def decode_value(payload, offset, depth=0):
+    tag = payload[offset:offset + 1]
+    offset += 1
+    if tag in ('T', 'L'):
+        if depth >= max_nesting:
+            raise WireFormatError
+        number, = count_field.unpack_from(payload, offset)
+        offset += count_field.size
+        elements = []
+        for _ in range(number):
+            element, offset = decode_value(payload, offset, depth + 1)
+            elements.append(element)
+        return (tuple(elements) if tag == 'T' else elements), offset
+    if tag == 'S':
+        length, = length_field.unpack_from(payload, offset)
+        offset += length_field.size
+        return payload[offset:offset + length], offset + length
+    if tag == 'I':
+        return integer_field.unpack_from(payload, offset)[0], offset + integer_field.size
+    if tag == 'N':
+        return None, offset
+    raise WireFormatError
+
+
+def receive_exactly(connection, size):
+    chunks = []
+    while size:
+        chunk = connection.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return ''.join(chunks)
+
+
+def receive_frame(connection):
+    header = receive_exactly(connection, frame_header.size)
+    if header is None:
+        return None
+    length, session_id = frame_header.unpack(header)
+    if length > max_frame_size:
+        raise WireFormatError
+    payload = receive_exactly(connection, length)
+    if payload is None:
+        return None
+    return session_id, decode_payload(payload)
+
+
+class FramedConnection(object):
+    def __init__(self, connection):
+        self.connection = connection
+        self.write_lock = Lock()
+
+    def send(self, session_id, message):
+        frame = encode_frame(session_id, message)
+        with self.write_lock:
+            self.connection.sendall(frame)
+
+    def receive(self):
+        return receive_frame(self.connection)
+
+    def close(self):
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.connection.close()
+
+
+class TransportServer(AbstractEntity):
+    def __init__(self, endpoint, host='127.0.0.1', port=0):
+        AbstractEntity.__init__(self)
+        self.daemon = True
+        self.endpoint = endpoint
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(128)
+        self.address = self.listener.getsockname()
+        self.connections = []
+        self.running = False
+
+    def run(self):
+        self.running = True
+        while self.running:
+            try:
+                connection, _ = self.listener.accept()
+            except socket.error:
+                break
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            framed = FramedConnection(connection)
+            self.connections.append(framed)
+            self.start_daemon(self.serve_connection, framed)
+
+    def serve_connection(self, framed):
+        while True:
+            try:
+                frame = framed.receive()
+            except (socket.error, struct.error, WireFormatError):
+                frame = None
+            if frame is None:
+                framed.close()
+                return
+            session_id, message = frame
+            connection = self.establish_connection(self.endpoint)
+            if self.is_message_error(connection):
+                self.reply_immediately(framed, session_id, connection)
+                continue
+            session_input, session_output = connection
+            session_input.put(message)
+            self.start_daemon(self.reply, framed, session_id, session_output)
+
+    @staticmethod
+    def reply(framed, session_id, session_output):
+        TransportServer.reply_immediately(framed, session_id, session_output.get())
+
+    @staticmethod
+    def reply_immediately(framed, session_id, message):
+        try:
+            framed.send(session_id, message)
+        except socket.error:
+            pass
+
+    @staticmethod
+    def start_daemon(target, *arguments):
+        thread = Thread(target=target, args=arguments)
+        thread.daemon = True
+        thread.start()
+
+    def finish(self):
+        self.running = False
+        self.listener.close()
+        for framed in self.connections:
+            framed.close()
+
+
+class RemoteEndpoint(AbstractVirtualEndpoint):
+    def __init__(self, address):
+        AbstractVirtualEndpoint.__init__(self)
+        connection = socket.create_connection(address)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.framed = FramedConnection(connection)
+        self.receiver = Thread(target=self.receive_responses)
+        self.receiver.daemon = True
+        self.receiver.start()
+
+    def send(self, session_id, message):
+        try:
+            self.framed.send(session_id, message)
+        except WireFormatError:
+            self.deliver(session_id, self.error_signal)
+
+    def receive_responses(self):
+        while True:
+            try:
+                frame = self.framed.receive()
+            except (socket.error, struct.error, WireFormatError):
+                frame = None
+            if frame is None:
+                self.fail_open_sessions()
+                return
+            self.deliver(*frame)
+
+    def close(self):
+        self.framed.close()
@@ -1,11 +1,32 @@
-import random
+from Nonces import KeyGenerator, NonceGenerator
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+identity_table = ''.join([chr(code) for code in range(256)])
+shift_tables = [identity_table[shift:] + identity_table[:shift] for shift in range(256)]
+
+key_generator = KeyGenerator()
+nonce_generator = NonceGenerator()
 
 
 def generate_random_key():
-    return random.randint(0, 100000)
+    return key_generator.next()
+
+
+def generate_nonce():
+    return nonce_generator.next()
 
 
 def decrypt(message, key):
+    if not isinstance(message, str):
+        return decrypt_by_character(message, key)
+    return message.translate(get_decryption_table(key))
+
+
+def decrypt_by_character(message, key):
     return ''.join([decrypt_character(char, key) for char in message])
 
 
@@ -14,6 +35,11 @@ def decrypt_character(char, key):
 
 
 def encrypt(message, key):
+    message = str(message)
+    return message.translate(get_encryption_table(key))
+
+
+def encrypt_by_character(message, key):
     return ''.join([encode_character(char, key) for char in str(message)])
 
 
@@ -21,8 +47,73 @@ def encode_character(char, key):
     return chr((ord(char) + key) % 256)
 
 
+def get_encryption_table(key):
+    return shift_tables[key % 256]
+
+
+def get_decryption_table(key):
+    return shift_tables[-key % 256]
+
+
+def encrypt_many(messages, keys):
+    messages = [str(message) for message in messages]
+    if numpy is None:
+        return [encrypt(message, key) for message, key in zip_keys(messages, keys)]
+    return shift_many(messages, [key % 256 for key in keys])
+
+
+def decrypt_many(messages, keys):
+    if numpy is None or not all(isinstance(message, str) for message in messages):
+        return [decrypt(message, key) for message, key in zip_keys(messages, keys)]
+    return shift_many(messages, [-key % 256 for key in keys])
+
+
+def zip_keys(messages, keys):
+    if len(messages) != len(keys):
+        raise ValueError('every message needs exactly one key')
+    return zip(messages, keys)
+
+
+def shift_many(messages, shifts):
+    zip_keys(messages, shifts)
+    if not messages:
+        return []
+    lengths = numpy.array([len(message) for message in messages], dtype=numpy.intp)
+    data = numpy.frombuffer(''.join(messages), dtype=numpy.uint8)
+    shifted = (data + numpy.repeat(numpy.array(shifts, dtype=numpy.uint8), lengths)).tostring()
+    ends = numpy.cumsum(lengths).tolist()
+    starts = [0] + ends[:-1]
+    return [shifted[start:end] for start, end in zip(starts, ends)]
+
+
+def parse_encrypted_fields(message, key, converters):
+    if isinstance(message, str):
+        fields = message.translate(shift_tables[-key % 256]).split(':')
+    else:
+        fields = decrypt_by_character(message, key).split(':')
+    if len(fields) != len(converters):
+        raise IndexError
+    if '' in fields:
+        raise InvalidMessage
+    return [convert(field) for convert, field in zip(converters, fields)]
+
+
+def split_fields(decrypted, converters):
+    fields = decrypted.split(':')
+    if len(fields) != len(converters):
+        raise IndexError
+    if '' in fields:
+        raise InvalidMessage
+    return [convert(field) for convert, field in zip(converters, fields)]
+
+
 def prepare_inner_message(encryption_key, nonce, random_value, client_id, server_id):
     return encrypt('{0}:{1}:{2}:{3}'.format(nonce,
                                             random_value,
                                             client_id,
                                             server_id), encryption_key)
+
+
+class InvalidMessage(Exception):
+    def __init__(self):
+        Exception.__init__(self)
@@ -0,0 +1,61 @@
+from Queue import Queue
+from itertools import count
+
+
+def reply_queue_of(hello, default):
+    if isinstance(hello, tuple) and len(hello) >= 3 and hello[2] is not None:
+        return hello[2]
+    return default
+
+
+class HelloQueue(object):
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def put(self, message):
+        self.endpoint.accept_hello(message)
+
+
+class SessionInputQueue(object):
+    def __init__(self, endpoint, session_id):
+        self.endpoint = endpoint
+        self.session_id = session_id
+
+    def put(self, message):
+        self.endpoint.send(self.session_id, message)
+
+    def cancel(self):
+        self.endpoint.cancel_session(self.session_id)
+
+
+class AbstractVirtualEndpoint(object):
+    def __init__(self):
+        self.error_signal = 'ERROR'
+        self.input_queue = HelloQueue(self)
+        self.output_queue = Queue()
+        self.session_ids = count()
+        self.sessions = {}
+
+    def accept_hello(self, hello_message):
+        reply_queue_of(hello_message, self.output_queue).put(self.open_session(hello_message))
+
+    def open_session(self, hello_message):
+        session_id = next(self.session_ids)
+        session_output = Queue()
+        self.sessions[session_id] = session_output
+        return SessionInputQueue(self, session_id), session_output
+
+    def deliver(self, session_id, message):
+        session_output = self.sessions.pop(session_id, None)
+        if session_output is not None:
+            session_output.put(message)
+
+    def cancel_session(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def fail_open_sessions(self):
+        for session_id in list(self.sessions):
+            self.deliver(session_id, self.error_signal)
+
+    def send(self, session_id, message):
+        raise NotImplementedError
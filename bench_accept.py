@@ -0,0 +1,34 @@
+import sys
+from threading import Thread
+from time import time
+
+from TrustedServer import TrustedServer
+
+
+def measure(acceptors, connections, clients):
+    trusted_server = TrustedServer(keys={}, max_connections=clients, invoke_workers=False, acceptors=acceptors)
+    trusted_server.start()
+
+    def connect_repeatedly():
+        for _ in range(connections / clients):
+            trusted_server.input_queue.put(trusted_server.hello_signal)
+            trusted_server.output_queue.get()
+            trusted_server.finish_worker()
+
+    threads = [Thread(target=connect_repeatedly) for _ in range(clients)]
+    started = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time() - started
+    trusted_server.finish()
+    trusted_server.join()
+    return connections / elapsed
+
+
+if __name__ == '__main__':
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    for acceptors in [1, 2, 4, 8]:
+        print '{0} acceptors  {1:10.0f} connections/s'.format(acceptors, measure(acceptors, connections, clients))
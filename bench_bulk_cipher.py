@@ -0,0 +1,30 @@
+import sys
+from time import time
+
+import Utils
+from Utils import encrypt, encrypt_by_character, encrypt_many, generate_random_key, prepare_inner_message
+
+
+def measure(function):
+    started = time()
+    function()
+    return time() - started
+
+
+def report(name, messages, keys):
+    per_character = measure(lambda: [encrypt_by_character(message, key) for message, key in zip(messages, keys)])
+    scalar = measure(lambda: [encrypt(message, key) for message, key in zip(messages, keys)])
+    bulk = measure(lambda: encrypt_many(messages, keys))
+    print '{0:<6} {1:>8} messages  per-character {2:8.3f}s  encrypt {3:8.3f}s  encrypt_many {4:8.3f}s'.format(
+        name, len(messages), per_character, scalar, bulk)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    if Utils.numpy is None:
+        print 'numpy is not installed, encrypt_many uses the scalar fallback'
+    keys = [generate_random_key() for _ in range(count)]
+    tickets = [prepare_inner_message(key, generate_random_key(), generate_random_key(), 'alice', 'bob')
+               for key in keys]
+    report('ticket', tickets, keys)
+    report('4kb', [ticket * 200 for ticket in tickets[:count / 100]], keys[:count / 100])
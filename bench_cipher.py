@@ -0,0 +1,27 @@
+import sys
+from timeit import timeit
+
+from Utils import encrypt, decrypt, encrypt_by_character, decrypt_by_character, prepare_inner_message
+
+key = 1231241
+short_message = prepare_inner_message(key, '48213', 91240, 'alice', 'bob')
+long_message = short_message * 200
+
+
+def measure(function, message, repetitions):
+    return timeit(lambda: function(message, key), number=repetitions) / repetitions
+
+
+def report(name, message, repetitions):
+    for label, by_character, translated in [('encrypt', encrypt_by_character, encrypt),
+                                            ('decrypt', decrypt_by_character, decrypt)]:
+        before = measure(by_character, message, repetitions)
+        after = measure(translated, message, repetitions)
+        print '{0:>6} {1:<7} {2:>7} bytes  per-character {3:10.2f}us  translate {4:8.2f}us  x{5:.1f}'.format(
+            name, label, len(message), before * 1e6, after * 1e6, before / after)
+
+
+if __name__ == '__main__':
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    report('short', short_message, repetitions)
+    report('long', long_message, max(1, repetitions / 20))
@@ -0,0 +1,33 @@
+import sys
+from time import time
+
+from Cooperative import EventLoop, CooperativeTrustedServer, CooperativeServer, CooperativeClient
+from Utils import generate_random_key
+
+
+def run_load(handshakes, principals):
+    loop = EventLoop()
+    keys = dict(('client-{0}'.format(number), generate_random_key()) for number in range(principals))
+    keys['server'] = generate_random_key()
+    trusted_server = CooperativeTrustedServer(loop, keys)
+    server = CooperativeServer(loop, 'server', keys['server'], trusted_server)
+    client_ids = sorted(key for key in keys if key != 'server')
+    started = time()
+    clients = []
+    for number in range(handshakes):
+        client_id = client_ids[number % len(client_ids)]
+        client = CooperativeClient(loop, client_id, keys[client_id], server, 'server')
+        client.start()
+        clients.append(client)
+    loop.run()
+    elapsed = time() - started
+    succeeded = sum(1 for client in clients if client.response == 'OK')
+    return elapsed, succeeded
+
+
+if __name__ == '__main__':
+    counts = [int(argument) for argument in sys.argv[1:]] or [1000, 10000, 100000]
+    for count in counts:
+        elapsed, succeeded = run_load(count, principals=100)
+        print '{0:>8} concurrent handshakes  {1:>8} ok  {2:8.2f}s  {3:10.0f} handshakes/s'.format(
+            count, succeeded, elapsed, count / elapsed)
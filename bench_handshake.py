@@ -0,0 +1,229 @@
+import argparse
+import json
+import subprocess
+from Queue import Queue, Empty
+from threading import Thread, Lock
+from time import time
+
+from Client import Client
+from Server import Server, ServerWorker
+from ShardedTrustedServer import ShardedTrustedServer
+from TrustedServer import TrustedServer
+from Utils import generate_random_key
+
+
+class LatencyRecorder(object):
+    def __init__(self):
+        self.samples = {}
+        self.lock = Lock()
+
+    def record(self, leg, seconds):
+        with self.lock:
+            self.samples.setdefault(leg, []).append(seconds)
+
+    def summary(self):
+        with self.lock:
+            return dict((leg, summarize(samples)) for leg, samples in self.samples.items())
+
+
+def percentile(ordered, fraction):
+    return ordered[int(round(fraction * (len(ordered) - 1)))]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {'count': len(ordered),
+            'mean_ms': 1000.0 * sum(ordered) / len(ordered),
+            'p50_ms': 1000.0 * percentile(ordered, 0.50),
+            'p95_ms': 1000.0 * percentile(ordered, 0.95),
+            'p99_ms': 1000.0 * percentile(ordered, 0.99)}
+
+
+class TimedInput(object):
+    def __init__(self, queue, timings):
+        self.queue = queue
+        self.timings = timings
+
+    def put(self, message):
+        self.timings['sent'] = time()
+        self.queue.put(message)
+
+
+class TimedOutput(object):
+    def __init__(self, queue, timings, recorder, leg):
+        self.queue = queue
+        self.timings = timings
+        self.recorder = recorder
+        self.leg = leg
+
+    def get(self, *arguments, **keywords):
+        message = self.queue.get(*arguments, **keywords)
+        self.recorder.record(self.leg, time() - self.timings['sent'])
+        return message
+
+
+class TimedServerWorker(ServerWorker):
+    def __init__(self, recorder, *arguments):
+        ServerWorker.__init__(self, *arguments)
+        self.recorder = recorder
+
+    def connect_to_trusted(self):
+        started = time()
+        connected = ServerWorker.connect_to_trusted(self)
+        self.recorder.record('trusted_connect', time() - started)
+        if not connected:
+            return False
+        timings = {}
+        self.trusted_server_input_queue = TimedInput(self.trusted_server_input_queue, timings)
+        self.trusted_server_output_queue = TimedOutput(self.trusted_server_output_queue, timings, self.recorder,
+                                                       'trusted_roundtrip')
+        return True
+
+
+class TimedServer(Server):
+    def __init__(self, recorder, *arguments, **keywords):
+        Server.__init__(self, *arguments, **keywords)
+        self.recorder = recorder
+
+    def get_new_worker(self):
+        return TimedServerWorker(self.recorder, self.server_id, self.server_key, self.trusted_endpoint, self,
+                                 self.pool_workers, self.session_cache, self.replay_detector, self.codec)
+
+
+def timed_handshake(client, recorder):
+    started = time()
+    server_input, server_output = client.establish_connection(client.server)
+    connected = time()
+    server_input.put(client.prepare_message_for_server())
+    response = client.process_message_from_server(server_output.get())
+    finished = time()
+    recorder.record('client_connect', connected - started)
+    recorder.record('server_roundtrip', finished - connected)
+    recorder.record('handshake', finished - started)
+    return response
+
+
+def build_keys(options):
+    keys = dict(('client-{0}'.format(number), generate_random_key()) for number in range(options.principals))
+    for number in range(options.servers):
+        keys['server-{0}'.format(number)] = generate_random_key()
+    return keys
+
+
+def start_trusted_server(options, keys):
+    if options.shards:
+        server_ids = ['server-{0}'.format(number) for number in range(options.servers)]
+        trusted_server = ShardedTrustedServer(keys=keys, max_connections=options.trusted_max_connections,
+                                              shards=options.shards, server_ids=server_ids,
+                                              pool_workers=options.pool_workers)
+    else:
+        trusted_server = TrustedServer(keys=keys, max_connections=options.trusted_max_connections,
+                                       pool_workers=options.pool_workers)
+    trusted_server.start()
+    return trusted_server
+
+
+def start_servers(options, keys, trusted_server, recorder):
+    servers = []
+    for number in range(options.servers):
+        server_id = 'server-{0}'.format(number)
+        server = TimedServer(recorder, server_id, keys[server_id], options.max_connections, trusted_server,
+                             pool_workers=options.pool_workers, batch_size=options.batch_size,
+                             trusted_channels=options.trusted_channels, channel_depth=options.channel_depth)
+        server.start()
+        servers.append(server)
+    return servers
+
+
+def drive_clients(options, keys, servers, recorder):
+    jobs = Queue()
+    for number in range(options.handshakes):
+        jobs.put(number)
+    outcomes = {'ok': 0, 'error': 0}
+    lock = Lock()
+
+    def work():
+        while True:
+            try:
+                number = jobs.get_nowait()
+            except Empty:
+                return
+            client_id = 'client-{0}'.format(number % options.principals)
+            server = servers[number % len(servers)]
+            client = Client(client_id=client_id, client_key=keys[client_id], server=server,
+                            server_id=server.server_id)
+            outcome = 'ok' if timed_handshake(client, recorder) == client.ok_signal else 'error'
+            with lock:
+                outcomes[outcome] += 1
+
+    threads = [Thread(target=work) for _ in range(options.concurrency)]
+    started = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time() - started, outcomes
+
+
+def current_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD']).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    recorder = LatencyRecorder()
+    keys = build_keys(options)
+    trusted_server = start_trusted_server(options, keys)
+    servers = start_servers(options, keys, trusted_server, recorder)
+    elapsed, outcomes = drive_clients(options, keys, servers, recorder)
+    channels = [server.channel_pool.statistics() for server in servers if server.channel_pool]
+    for server in servers:
+        server.finish()
+    trusted_server.finish()
+    return {'commit': current_commit(),
+            'config': vars(options),
+            'elapsed_s': elapsed,
+            'handshakes_per_second': options.handshakes / elapsed,
+            'outcomes': outcomes,
+            'legs': recorder.summary(),
+            'channels': channels}
+
+
+def print_report(result):
+    print '{0} handshakes in {1:.2f}s: {2:.0f} handshakes/s, {3[ok]} ok, {3[error]} error'.format(
+        result['config']['handshakes'], result['elapsed_s'], result['handshakes_per_second'], result['outcomes'])
+    for leg, summary in sorted(result['legs'].items()):
+        print '  {0:<18} p50 {1[p50_ms]:8.3f}ms  p95 {1[p95_ms]:8.3f}ms  p99 {1[p99_ms]:8.3f}ms'.format(leg, summary)
+    for statistics in result['channels']:
+        print '  channels {0[channels]} x depth {0[depth]}: utilization {0[utilization]:.2f}, ' \
+              'peak in flight {0[peak_in_flight]}'.format(statistics)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='End-to-end Otway-Rees handshake benchmark')
+    parser.add_argument('--handshakes', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--principals', type=int, default=100)
+    parser.add_argument('--servers', type=int, default=1)
+    parser.add_argument('--max-connections', type=int, default=16)
+    parser.add_argument('--trusted-max-connections', type=int, default=32)
+    parser.add_argument('--pool-workers', action='store_true')
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--trusted-channels', type=int, default=None,
+                        help='keep this many persistent channels from each server to the trusted server')
+    parser.add_argument('--channel-depth', type=int, default=16)
+    parser.add_argument('--shards', type=int, default=None,
+                        help='run the trusted server as this many worker processes')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    results = run(arguments)
+    print_report(results)
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(results, output, indent=2, sort_keys=True)
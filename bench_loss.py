@@ -0,0 +1,36 @@
+import sys
+from time import time
+
+from Client import Client
+from Server import Server
+from TrustedServer import TrustedServer
+
+
+def abandon_sessions(server, number):
+    for _ in range(number):
+        server.input_queue.put(server.hello_signal)
+        server.output_queue.get()
+
+
+if __name__ == '__main__':
+    abandoned = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    session_timeout = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+    keys = {'alice': 123, 'bob': 321}
+    trusted = TrustedServer(keys=keys, max_connections=4, session_timeout=session_timeout)
+    server = Server(server_id='bob', server_key=321, max_connections=4, trusted_server=trusted,
+                    session_timeout=session_timeout)
+    trusted.start()
+    server.start()
+    started = time()
+    abandon_sessions(server, abandoned)
+    client = Client(client_id='alice', client_key=keys['alice'], server=server, server_id='bob', timeout=5)
+    response = client.handshake()
+    elapsed = time() - started
+    server.finish()
+    trusted.finish()
+    server.join()
+    trusted.join()
+    print '{0} abandoned sessions  timeout {1}s  recovered in {2:.2f}s  handshake {3}'.format(
+        abandoned, session_timeout, elapsed, response)
+    print 'server  ', server.admission_statistics()
+    print 'trusted ', trusted.admission_statistics()
@@ -0,0 +1,46 @@
+import gc
+import os
+import subprocess
+import sys
+
+from Client import Client
+from Server import ServerWorker
+from Sessions import ClientSession, ServerSession, TrustedSession
+from TrustedServer import TrustedServerWorker
+
+page_size = os.sysconf('SC_PAGE_SIZE')
+
+
+def resident_bytes():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * page_size
+
+
+def thread_entities():
+    return (Client(client_id='alice', client_key=123, server=None, server_id='bob'),
+            ServerWorker('bob', 321, None),
+            TrustedServerWorker({}))
+
+
+def session_records():
+    return ClientSession(), ServerSession(), TrustedSession()
+
+
+def measure(mode, count):
+    build = {'entities': thread_entities, 'sessions': session_records}[mode]
+    gc.collect()
+    before = resident_bytes()
+    handshakes = [build() for _ in range(count)]
+    gc.collect()
+    return (resident_bytes() - before) / float(len(handshakes))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        print measure(sys.argv[1], int(sys.argv[2]))
+        sys.exit(0)
+    count = sys.argv[1] if len(sys.argv) > 1 else '20000'
+    for mode, label in [('entities', 'Client + ServerWorker + TrustedServerWorker'),
+                        ('sessions', 'ClientSession + ServerSession + TrustedSession')]:
+        per_handshake = float(subprocess.check_output([sys.executable, __file__, mode, count]))
+        print '{0:<48} {1:10.0f} bytes per in-flight handshake'.format(label, per_handshake)
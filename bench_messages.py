@@ -0,0 +1,45 @@
+import sys
+from time import time
+from timeit import timeit
+
+from Messages import InnerTicket, SessionTicket, string_codec, struct_codec
+from Protocol import ClientMachine, ServerWorkerMachine, TrustedMachine, run_in_memory
+from Utils import encrypt, decrypt
+
+key = 1231241
+inner = InnerTicket('2305843009213693951', 1152921504606846975, 'client-12345', 'server-7')
+session = SessionTicket('2305843009213693951', '73519')
+
+
+def measure(codec, number):
+    encrypted_inner = encrypt(codec.encode_inner(inner), key)
+    encrypted_session = encrypt(codec.encode_session(session), key)
+    return [
+        timeit(lambda: encrypt(codec.encode_inner(inner), key), number=number) / number,
+        timeit(lambda: codec.decode_inner(decrypt(encrypted_inner, key)), number=number) / number,
+        timeit(lambda: encrypt(codec.encode_session(session), key), number=number) / number,
+        timeit(lambda: codec.decode_session(decrypt(encrypted_session, key)), number=number) / number,
+        len(encrypted_inner),
+    ]
+
+
+def handshakes_per_second(codec, handshakes):
+    keys = {'client': 1234, 'server': 4321}
+    client = ClientMachine('client', keys['client'], 'server', codec=codec)
+    server = ServerWorkerMachine('server', keys['server'], codec=codec)
+    trusted = TrustedMachine(keys, codec=codec)
+    started = time()
+    for _ in xrange(handshakes):
+        run_in_memory(client, server, trusted)
+    return handshakes / (time() - started)
+
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print '{0:8s} {1:>14s} {2:>14s} {3:>16s} {4:>16s} {5:>12s} {6:>14s}'.format(
+        'codec', 'encode inner', 'decode inner', 'encode session', 'decode session', 'inner bytes', 'handshakes/s')
+    for name, codec in [('string', string_codec), ('struct', struct_codec)]:
+        encode_inner, decode_inner, encode_session, decode_session, size = measure(codec, number)
+        print '{0:8s} {1:12.3f}us {2:12.3f}us {3:14.3f}us {4:14.3f}us {5:12d} {6:14.0f}'.format(
+            name, encode_inner * 1e6, decode_inner * 1e6, encode_session * 1e6, decode_session * 1e6, size,
+            handshakes_per_second(codec, number / 10))
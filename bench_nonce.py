@@ -0,0 +1,46 @@
+import random
+import sys
+from threading import Thread
+from time import time
+
+from Nonces import NonceGenerator, DuplicateDetector
+
+
+def measure(draw, threads, draws):
+    def run():
+        for _ in xrange(draws):
+            draw()
+
+    workers = [Thread(target=run) for _ in range(threads)]
+    started = time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return threads * draws / (time() - started)
+
+
+def measure_fresh_threads(draw, draws):
+    started = time()
+    for _ in xrange(draws):
+        worker = Thread(target=draw)
+        worker.start()
+        worker.join()
+    return draws / (time() - started)
+
+
+if __name__ == '__main__':
+    draws = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    generator = NonceGenerator()
+    detector = DuplicateDetector()
+    candidates = [
+        ('random.randint', lambda: random.randint(0, 100000)),
+        ('NonceGenerator', generator.next),
+        ('NonceGenerator+detector', lambda: detector.is_duplicate(generator.next())),
+    ]
+    for threads in [1, 4, 16]:
+        for name, draw in candidates:
+            print '{0:2d} threads  {1:24s} {2:12.0f} draws/s'.format(threads, name,
+                                                                      measure(draw, threads, draws / threads))
+    for name, draw in candidates:
+        print 'thread per draw  {0:24s} {1:12.0f} draws/s'.format(name, measure_fresh_threads(draw, draws / 50))
@@ -0,0 +1,27 @@
+import sys
+from timeit import timeit
+
+from Protocol import AbstractMachine
+from Utils import decrypt, parse_encrypted_fields, prepare_inner_message
+
+key = 1231241
+message = prepare_inner_message(key, '48213', 91240, 'client-12345', 'server-7')
+converters = (str, int, str, str)
+
+
+def split_and_convert():
+    fields = decrypt(message, key).split(':')
+    AbstractMachine.validate_message_length(fields, 4)
+    return fields[0], int(fields[1]), fields[2], fields[3]
+
+
+def single_pass():
+    return parse_encrypted_fields(message, key, converters)
+
+
+if __name__ == '__main__':
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    before = timeit(split_and_convert, number=repetitions) / repetitions
+    after = timeit(single_pass, number=repetitions) / repetitions
+    print 'decrypt + split + validate  {0:8.3f}us per ticket'.format(before * 1e6)
+    print 'parse_encrypted_fields      {0:8.3f}us per ticket'.format(after * 1e6)
@@ -0,0 +1,28 @@
+import sys
+from time import time
+
+from Protocol import ClientMachine, ServerWorkerMachine, TrustedMachine, run_in_memory
+
+
+def simulate(handshakes, principals):
+    keys = dict(('client-{0}'.format(number), 1000 + number) for number in range(principals))
+    keys['server'] = 4242
+    clients = [ClientMachine('client-{0}'.format(number), keys['client-{0}'.format(number)], 'server')
+               for number in range(principals)]
+    server = ServerWorkerMachine('server', keys['server'])
+    trusted = TrustedMachine(keys)
+    succeeded = 0
+    started = time()
+    for number in xrange(handshakes):
+        client = clients[number % principals]
+        if run_in_memory(client, server, trusted) == client.ok_signal:
+            succeeded += 1
+    return succeeded, time() - started
+
+
+if __name__ == '__main__':
+    handshakes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    principals = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    succeeded, elapsed = simulate(handshakes, principals)
+    print '{0} handshakes, {1} ok, {2:.2f}s, {3:.0f} handshakes/s, {4:.2f}us per handshake'.format(
+        handshakes, succeeded, elapsed, handshakes / elapsed, elapsed / handshakes * 1e6)
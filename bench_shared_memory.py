@@ -0,0 +1,65 @@
+import sys
+from multiprocessing import Process, Queue
+from time import time
+
+from SharedMemory import SharedRing
+
+request = (123456789, 'alice', 'bob', 'x' * 40, 'y' * 40)
+response = (123456789, 'x' * 20, 'y' * 20)
+
+
+def echo_ring(requests, responses):
+    while True:
+        session_id, message = requests.get()
+        if message is None:
+            return
+        responses.put(session_id, response)
+
+
+def echo_queue(requests, responses):
+    while True:
+        message = requests.get()
+        if message is None:
+            return
+        responses.put((message[0], response))
+
+
+def measure_ring(messages, window):
+    requests, responses = SharedRing(), SharedRing()
+    process = Process(target=echo_ring, args=(requests, responses))
+    process.start()
+    started = time()
+    for session_id in xrange(messages):
+        requests.put(session_id, request)
+        if session_id >= window:
+            responses.get()
+    for _ in xrange(min(window, messages)):
+        responses.get()
+    elapsed = time() - started
+    requests.put(0, None)
+    process.join()
+    return messages / elapsed
+
+
+def measure_queue(messages, window):
+    requests, responses = Queue(), Queue()
+    process = Process(target=echo_queue, args=(requests, responses))
+    process.start()
+    started = time()
+    for session_id in xrange(messages):
+        requests.put((session_id, request))
+        if session_id >= window:
+            responses.get()
+    for _ in xrange(min(window, messages)):
+        responses.get()
+    elapsed = time() - started
+    requests.put(None)
+    process.join()
+    return messages / elapsed
+
+
+if __name__ == '__main__':
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    for window in [0, 16, 128]:
+        print 'in flight {0:4d}  shared memory {1:10.0f} round trips/s  multiprocessing.Queue {2:10.0f} round trips/s'\
+            .format(max(window, 1), measure_ring(messages, window), measure_queue(messages, window))
@@ -0,0 +1,28 @@
+import resource
+import sys
+from threading import Thread
+from time import time
+
+from TrustedServer import TrustedServer
+
+
+def resident_kilobytes():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+if __name__ == '__main__':
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    report_every = max(1, connections / 10)
+    trusted_server = TrustedServer(keys={}, max_connections=1, invoke_workers=False)
+    accept_loop = Thread(target=trusted_server.run)
+    accept_loop.start()
+    started = time()
+    for number in xrange(1, connections + 1):
+        trusted_server.input_queue.put(trusted_server.hello_signal)
+        trusted_server.output_queue.get()
+        trusted_server.finish_worker()
+        if number % report_every == 0:
+            print '{0:>9} connections  {1:6.1f}s  waiting queues {2:>3}  max rss {3:>8} kB'.format(
+                number, time() - started, len(trusted_server.waiting_queues), resident_kilobytes())
+    trusted_server.finish()
+    accept_loop.join()
@@ -0,0 +1,75 @@
+import sys
+from Queue import Queue, Empty
+from threading import Thread
+from time import time
+
+from Client import Client
+from Server import Server
+from Transport import TransportServer, RemoteEndpoint
+from TrustedServer import TrustedServer
+
+keys = {'alice': 123, 'bob': 321}
+
+
+def handshake(endpoint):
+    client = Client(client_id='alice', client_key=keys['alice'], server=endpoint, server_id='bob')
+    server_input, server_output = client.establish_connection(endpoint)
+    server_input.put(client.prepare_message_for_server())
+    return client.process_message_from_server(server_output.get())
+
+
+def drive(endpoint, handshakes, concurrency):
+    jobs = Queue()
+    for _ in range(handshakes):
+        jobs.put(True)
+    results = []
+
+    def work():
+        while True:
+            try:
+                jobs.get_nowait()
+            except Empty:
+                return
+            results.append(handshake(endpoint))
+
+    threads = [Thread(target=work) for _ in range(concurrency)]
+    started = time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time() - started, results.count('OK')
+
+
+def run(handshakes, concurrency, over_tcp):
+    trusted = TrustedServer(keys=keys, max_connections=concurrency * 2)
+    trusted.start()
+    transports = []
+    trusted_endpoint = trusted
+    if over_tcp:
+        transports.append(TransportServer(trusted))
+        trusted_endpoint = RemoteEndpoint(transports[-1].address)
+    server = Server(server_id='bob', server_key=keys['bob'], max_connections=concurrency * 2,
+                    trusted_server=trusted_endpoint)
+    server.start()
+    server_endpoint = server
+    if over_tcp:
+        transports.append(TransportServer(server))
+        server_endpoint = RemoteEndpoint(transports[-1].address)
+    for transport in transports:
+        transport.start()
+    elapsed, succeeded = drive(server_endpoint, handshakes, concurrency)
+    for transport in transports:
+        transport.finish()
+    server.finish()
+    trusted.finish()
+    return elapsed, succeeded
+
+
+if __name__ == '__main__':
+    handshakes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    for name, over_tcp in [('queue', False), ('tcp', True)]:
+        elapsed, succeeded = run(handshakes, concurrency, over_tcp)
+        print '{0:<6} {1:>6} handshakes  {2:>6} ok  {3:7.2f}s  {4:8.0f} handshakes/s'.format(
+            name, handshakes, succeeded, elapsed, handshakes / elapsed)
@@ -0,0 +1,88 @@
+import unittest
+from threading import Thread
+
+from CipherCache import CipherContext, CipherContextCache
+from Utils import encrypt, decrypt
+
+
+class CipherContextTest(unittest.TestCase):
+    def test_encrypt_matches_utils_encrypt(self):
+        context = CipherContext(1231241)
+        self.assertEqual(context.encrypt('nonce:12345'), encrypt('nonce:12345', 1231241))
+
+    def test_decrypt_matches_utils_decrypt(self):
+        context = CipherContext(563)
+        self.assertEqual(context.decrypt('encrypted'), decrypt('encrypted', 563))
+
+
+class CipherContextCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.keys = {'alice': 12, 'bob': 23, 'carol': 44}
+        self.cache = CipherContextCache(self.keys, max_size=2)
+
+    def test_first_lookup_is_a_miss_and_second_is_a_hit(self):
+        first = self.cache.get('alice')
+        second = self.cache.get('alice')
+        self.assertIs(first, second)
+        self.assertEqual(self.cache.misses, 1)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_least_recently_used_context_is_evicted(self):
+        self.cache.get('alice')
+        self.cache.get('bob')
+        self.cache.get('alice')
+        self.cache.get('carol')
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertIn('alice', self.cache.contexts)
+        self.assertNotIn('bob', self.cache.contexts)
+
+    def test_large_cache_evicts_a_batch_of_the_oldest_contexts(self):
+        keys = dict((identifier, identifier) for identifier in range(20))
+        cache = CipherContextCache(keys, max_size=16)
+        for identifier in range(16):
+            cache.get(identifier)
+        cache.get(0)
+        cache.get(16)
+        self.assertEqual(cache.evictions, 2)
+        self.assertIn(0, cache.contexts)
+        self.assertNotIn(1, cache.contexts)
+        self.assertNotIn(2, cache.contexts)
+        self.assertLessEqual(cache.statistics()['size'], 16)
+
+    def test_changed_key_invalidates_the_context(self):
+        self.cache.get('alice')
+        self.keys['alice'] = 99
+        context = self.cache.get('alice')
+        self.assertEqual(context.key, 99)
+        self.assertEqual(self.cache.invalidations, 1)
+
+    def test_missing_identifier_raises_key_error(self):
+        self.assertRaises(KeyError, self.cache.get, 'mallory')
+
+    def test_invalidated_context_is_rebuilt(self):
+        first = self.cache.get('alice')
+        self.cache.invalidate('alice')
+        self.assertIsNot(self.cache.get('alice'), first)
+        self.assertEqual(self.cache.invalidations, 1)
+
+    def test_concurrent_lookups_return_matching_contexts(self):
+        contexts = []
+
+        def lookup():
+            for _ in range(200):
+                contexts.append(self.cache.get('alice'))
+                contexts.append(self.cache.get('bob'))
+
+        threads = [Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(set([context.key for context in contexts]), set([12, 23]))
+        statistics = self.cache.statistics()
+        self.assertEqual(statistics['size'], 2)
+        self.assertLessEqual(statistics['hits'] + statistics['misses'], 1600)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,7 +4,7 @@ from Queue import Queue
 from mock import MagicMock
 
 from Client import Client
-from Server import AbstractQueueEntity
+from Server import AbstractQueueEntity, Server
 from Utils import decrypt, encrypt
 
 
@@ -112,6 +112,40 @@ class ClientTests(unittest.TestCase):
         self.assertEqual(response, self.client.ok_signal)
 
 
+class ClientResumptionTests(unittest.TestCase):
+    def setUp(self):
+        self.session_key = '4711'
+        self.client = Client(client_id='alice', client_key=123, server=None, server_id='bob',
+                             session_key=self.session_key)
+
+    def test_resumption_message_carries_a_ticket_encrypted_with_the_session_key(self):
+        message = self.client.prepare_resumption_for_server()
+        self.assertEqual(message[:3], ('RESUME', 'alice', 'bob'))
+        decrypted = decrypt(message[3], int(self.session_key)).split(':')
+        self.assertEqual(decrypted, [self.client.nonce, 'alice', 'bob'])
+
+    def test_resumption_response_with_matching_nonce_is_ok(self):
+        self.client.prepare_resumption_for_server()
+        answer = encrypt('{0}:{1}'.format(self.client.nonce, 'bob'), int(self.session_key))
+        self.assertEqual(self.client.process_resumption_from_server(('RESUME', answer)), self.client.ok_signal)
+
+    def test_resumption_response_with_wrong_nonce_is_error(self):
+        self.client.prepare_resumption_for_server()
+        answer = encrypt('{0}:{1}'.format('other', 'bob'), int(self.session_key))
+        self.assertEqual(self.client.process_resumption_from_server(('RESUME', answer)), self.client.error_signal)
+
+    def test_run_falls_back_to_a_full_handshake_when_resumption_fails(self):
+        server_input, server_output = Queue(), Queue()
+        server_output.put(self.client.error_signal)
+        server_output.put('mock_message_from_server')
+        self.client.establish_connection = MagicMock(return_value=(server_input, server_output))
+        self.client.process_message_from_server = MagicMock(return_value=self.client.ok_signal)
+        self.client.print_ok_response = MagicMock()
+        self.client.run()
+        self.client.process_message_from_server.assert_called_with('mock_message_from_server')
+        self.assertTrue(self.client.print_ok_response.called)
+
+
 class ClientRunTests(unittest.TestCase):
     def setUp(self):
         self.client_key = 1231241
@@ -161,6 +195,30 @@ class ClientRunTests(unittest.TestCase):
         self.assertTrue(self.client.print_error_message.called)
 
 
+class ClientAdmissionTests(unittest.TestCase):
+    def test_hello_carries_the_client_id(self):
+        client = Client(client_id='alice', client_key=123, server=None, server_id='bob')
+        reply_queue = Queue()
+        self.assertEqual(client.hello_message(reply_queue), ('HELLO', 'alice', reply_queue))
+
+    def test_hello_carries_the_deadline_once_the_handshake_starts(self):
+        client = Client(client_id='alice', client_key=123, server=None, server_id='bob', timeout=5)
+        client.start_deadline()
+        reply_queue = Queue()
+        self.assertEqual(client.hello_message(reply_queue), ('HELLO', 'alice', reply_queue, client.deadline))
+
+    def test_unanswered_handshake_returns_error_signal_after_the_timeout(self):
+        server = Server(server_id='bob', server_key=321, max_connections=1, trusted_server=None, invoke_workers=False)
+        client = Client(client_id='alice', client_key=123, server=server, server_id='bob', timeout=0.01)
+        self.assertEqual(client.handshake(), client.error_signal)
+
+    def test_rejected_connection_returns_error_signal(self):
+        client = Client(client_id='alice', client_key=123, server=None, server_id='bob')
+        client.establish_connection = MagicMock(return_value=client.error_signal)
+        response = client.handshake()
+        self.assertEqual(response, client.error_signal)
+
+
 class ClientPrepareMessageForServerTest(unittest.TestCase):
     def setUp(self):
         self.client = Client(client_id='client_id', client_key=123, server='mockServer', server_id=None)
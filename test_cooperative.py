@@ -0,0 +1,70 @@
+import unittest
+
+from Cooperative import EventLoop, Channel, CooperativeTrustedServer, CooperativeServer, CooperativeClient
+from Messages import struct_codec
+
+
+class ChannelTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = EventLoop()
+        self.received = []
+
+    def receiver(self, channel):
+        message = yield channel
+        self.received.append(message)
+
+    def test_waiting_coroutine_is_resumed_by_put(self):
+        channel = Channel(self.loop)
+        self.loop.spawn(self.receiver(channel))
+        self.loop.run()
+        channel.put('message')
+        self.loop.run()
+        self.assertEqual(self.received, ['message'])
+
+    def test_queued_item_is_delivered_immediately(self):
+        channel = Channel(self.loop)
+        channel.put('message')
+        self.loop.spawn(self.receiver(channel))
+        self.loop.run()
+        self.assertEqual(self.received, ['message'])
+
+
+class CooperativeHandshakeTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = EventLoop()
+        self.keys = {'alice': 123, 'bob': 321, 'carol': 555}
+        self.trusted = CooperativeTrustedServer(self.loop, self.keys)
+        self.server = CooperativeServer(self.loop, 'bob', 321, self.trusted)
+
+    def start_client(self, client_id, server_id='bob'):
+        client = CooperativeClient(self.loop, client_id, self.keys[client_id], self.server, server_id)
+        client.start()
+        return client
+
+    def test_single_handshake_succeeds(self):
+        client = self.start_client('alice')
+        self.loop.run()
+        self.assertEqual(client.response, 'OK')
+
+    def test_many_concurrent_handshakes_share_one_worker_per_server(self):
+        clients = [self.start_client('alice') for _ in range(50)] + [self.start_client('carol') for _ in range(50)]
+        self.loop.run()
+        self.assertEqual([client.response for client in clients], ['OK'] * 100)
+        self.assertGreater(len(set(client.client.session_key for client in clients)), 1)
+
+    def test_handshake_with_the_struct_codec_succeeds(self):
+        trusted = CooperativeTrustedServer(self.loop, self.keys, codec=struct_codec)
+        server = CooperativeServer(self.loop, 'bob', 321, trusted, codec=struct_codec)
+        client = CooperativeClient(self.loop, 'alice', 123, server, 'bob', codec=struct_codec)
+        client.start()
+        self.loop.run()
+        self.assertEqual(client.response, 'OK')
+
+    def test_wrong_server_id_returns_error(self):
+        client = self.start_client('alice', server_id='mallory')
+        self.loop.run()
+        self.assertEqual(client.response, 'ERROR')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+
+from Client import Client
+from Instrumentation import Histogram, HistogramSink, Instrumentation, LevelHistogram, disabled
+from Server import Server
+from TrustedServer import TrustedServer
+
+
+class HistogramTest(unittest.TestCase):
+    def test_empty_histogram_reports_zero(self):
+        self.assertEqual(Histogram().percentile(0.5), 0.0)
+
+    def test_percentiles_fall_in_the_right_bucket(self):
+        histogram = Histogram()
+        for _ in range(99):
+            histogram.record(0.000003)
+        histogram.record(0.5)
+        self.assertEqual(histogram.percentile(0.5), 0.000004)
+        self.assertGreaterEqual(histogram.percentile(1.0), 0.5)
+        self.assertEqual(histogram.summary()['count'], 100)
+        self.assertEqual(histogram.maximum, 0.5)
+
+    def test_values_beyond_the_last_bucket_report_the_maximum(self):
+        histogram = Histogram()
+        histogram.record(10000.0)
+        self.assertEqual(histogram.percentile(0.99), 10000.0)
+
+
+class LevelHistogramTest(unittest.TestCase):
+    def test_percentiles_are_exact_integer_levels(self):
+        histogram = LevelHistogram()
+        for level in [1, 2, 2, 3, 500]:
+            histogram.record(level)
+        self.assertEqual(histogram.percentile(0.50), 2)
+        self.assertEqual(histogram.percentile(0.99), 500)
+        self.assertEqual(histogram.summary()['max'], 500)
+
+    def test_empty_histogram_reports_zero(self):
+        self.assertEqual(LevelHistogram().percentile(0.5), 0.0)
+
+
+class InstrumentationTest(unittest.TestCase):
+    def test_stop_records_the_stage_duration(self):
+        sink = HistogramSink()
+        instrumentation = Instrumentation(sink)
+        instrumentation.stop('stage', instrumentation.start())
+        instrumentation.observe('workers_busy', 3)
+        snapshot = sink.snapshot()
+        self.assertEqual(snapshot['stage']['count'], 1)
+        self.assertEqual(snapshot['workers_busy']['max'], 3)
+        self.assertEqual(snapshot['workers_busy']['p50'], 3)
+
+    def test_disabled_instrumentation_records_nothing(self):
+        self.assertIsNone(disabled.start())
+        disabled.stop('stage', None)
+        disabled.observe('workers_busy', 3)
+
+
+class InstrumentedHandshakeTest(unittest.TestCase):
+    def test_every_stage_of_a_handshake_is_recorded(self):
+        sink = HistogramSink()
+        instrumentation = Instrumentation(sink)
+        trusted = TrustedServer(keys={'alice': 123, 'bob': 321}, max_connections=2, instrumentation=instrumentation)
+        server = Server(server_id='bob', server_key=321, max_connections=2, trusted_server=trusted,
+                        instrumentation=instrumentation)
+        trusted.start()
+        server.start()
+        client = Client(client_id='alice', client_key=123, server=server, server_id='bob',
+                        instrumentation=instrumentation)
+        response = client.handshake()
+        server.finish()
+        trusted.finish()
+        server.join()
+        trusted.join()
+        self.assertEqual(response, 'OK')
+        stages = set(sink.snapshot())
+        self.assertTrue({'establish_connection', 'worker_slot_wait', 'workers_busy', 'server_wait_for_client',
+                         'server_process_client', 'server_trusted_roundtrip', 'server_process_trusted',
+                         'trusted_process', 'client_server_roundtrip', 'client_process_response'} <= stages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from KeyStore import DictKeyStore, FileKeyStore
+from TrustedServer import TrustedServerWorker
+from Utils import prepare_inner_message
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class DictKeyStoreTest(unittest.TestCase):
+    def test_lookup_and_membership(self):
+        store = DictKeyStore({'alice': 123})
+        self.assertEqual(store['alice'], 123)
+        self.assertIn('alice', store)
+        self.assertNotIn('bob', store)
+        self.assertRaises(KeyError, store.__getitem__, 'bob')
+
+
+class FileKeyStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'keys')
+        self.keys = dict(('client-{0}'.format(number), number * 7) for number in range(1000))
+        FileKeyStore.write(self.path, self.keys)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_every_key_is_found(self):
+        store = FileKeyStore(self.path)
+        for identifier, key in self.keys.items():
+            self.assertEqual(store[identifier], key)
+
+    def test_missing_identifiers_are_not_found(self):
+        store = FileKeyStore(self.path)
+        for identifier in ['', 'a', 'client-', 'client-1000', 'client-999x', 'zzz']:
+            self.assertNotIn(identifier, store)
+
+    def test_items_returns_everything(self):
+        self.assertEqual(dict(FileKeyStore(self.path).items()), self.keys)
+
+    def test_empty_file_has_no_keys(self):
+        FileKeyStore.write(self.path, {})
+        self.assertNotIn('client-1', FileKeyStore(self.path))
+
+    def test_file_without_a_trailing_newline_is_searched_to_the_end(self):
+        with open(self.path, 'wb') as key_file:
+            key_file.write('a\t1\nb\t2')
+        store = FileKeyStore(self.path)
+        self.assertEqual(store['a'], 1)
+        self.assertEqual(store['b'], 2)
+        for identifier in ['', '0', 'ab', 'c']:
+            self.assertNotIn(identifier, store)
+
+    def test_identifiers_with_separators_are_rejected(self):
+        self.assertRaises(ValueError, FileKeyStore.write, self.path, {'a\tb': 1})
+
+    def test_reload_picks_up_a_rewritten_file(self):
+        store = FileKeyStore(self.path)
+        FileKeyStore.write(self.path, {'client-1': 99, 'newcomer': 5})
+        self.assertTrue(store.reload())
+        self.assertEqual(store['client-1'], 99)
+        self.assertEqual(store['newcomer'], 5)
+        self.assertFalse(store.reload())
+
+    def test_reload_happens_automatically_after_the_interval(self):
+        clock = FakeClock()
+        store = FileKeyStore(self.path, reload_interval=5, clock=clock)
+        FileKeyStore.write(self.path, {'newcomer': 5})
+        self.assertNotIn('newcomer', store)
+        clock.now += 5
+        self.assertIn('newcomer', store)
+        self.assertEqual(store.reloads, 1)
+
+    def test_trusted_server_worker_accepts_a_file_key_store(self):
+        FileKeyStore.write(self.path, {'alice': 33, 'bob': 55})
+        worker = TrustedServerWorker(FileKeyStore(self.path))
+        message = (471928, 'alice', 'bob',
+                   prepare_inner_message(33, 'client_nonce', 471928, 'alice', 'bob'),
+                   prepare_inner_message(55, 'server_nonce', 471928, 'alice', 'bob'))
+        output = worker.process_message_from_server_and_generate_answer(message)
+        self.assertEqual(output[0], 471928)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from Messages import InnerTicket, SessionTicket, TrustedResponse, string_codec, struct_codec
+from Utils import InvalidMessage
+
+
+class RecordTest(unittest.TestCase):
+    def test_records_compare_equal_to_plain_tuples(self):
+        self.assertEqual(TrustedResponse(1, 'a', 'b'), (1, 'a', 'b'))
+        self.assertEqual(TrustedResponse(1, 'a', 'b')[:-1], (1, 'a'))
+
+
+class StringCodecTest(unittest.TestCase):
+    def test_inner_ticket_keeps_the_colon_format(self):
+        ticket = InnerTicket('nonce', 42, 'alice', 'bob')
+        self.assertEqual(string_codec.encode_inner(ticket), 'nonce:42:alice:bob')
+        self.assertEqual(string_codec.decode_inner('nonce:42:alice:bob'), ticket)
+
+    def test_session_ticket_round_trips(self):
+        ticket = SessionTicket('nonce', '12345')
+        self.assertEqual(string_codec.decode_session(string_codec.encode_session(ticket)), ticket)
+
+    def test_wrong_field_count_raises_index_error(self):
+        self.assertRaises(IndexError, string_codec.decode_inner, 'nonce:42:alice')
+
+
+class StructCodecTest(unittest.TestCase):
+    def test_inner_ticket_round_trips(self):
+        ticket = InnerTicket('1234567890123', 4611686018427387903, 'alice', 'bob')
+        encoded = struct_codec.encode_inner(ticket)
+        self.assertEqual(len(encoded), struct_codec.inner_layout.size)
+        self.assertEqual(struct_codec.decode_inner(encoded), ticket)
+
+    def test_session_ticket_round_trips_as_strings(self):
+        encoded = struct_codec.encode_session(SessionTicket('987654321', 4242))
+        self.assertEqual(struct_codec.decode_session(encoded), ('987654321', '4242'))
+
+    def test_colons_in_identifiers_are_allowed(self):
+        ticket = InnerTicket('1', 2, 'alice:admin', 'bob')
+        self.assertEqual(struct_codec.decode_inner(struct_codec.encode_inner(ticket)).client_id, 'alice:admin')
+
+    def test_identifier_wider_than_the_layout_is_rejected(self):
+        self.assertRaises(ValueError, struct_codec.encode_inner, InnerTicket('1', 2, 'a' * 33, 'bob'))
+
+    def test_random_value_outside_the_layout_is_rejected(self):
+        self.assertRaises(ValueError, struct_codec.encode_inner, InnerTicket('1', 2 ** 63, 'alice', 'bob'))
+
+    def test_truncated_ticket_raises_index_error(self):
+        encoded = struct_codec.encode_inner(InnerTicket('1', 2, 'alice', 'bob'))
+        self.assertRaises(IndexError, struct_codec.decode_inner, encoded[:-1])
+
+    def test_empty_identifier_is_invalid(self):
+        encoded = struct_codec.encode_inner(InnerTicket('1', 2, '', 'bob'))
+        self.assertRaises(InvalidMessage, struct_codec.decode_inner, encoded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+from threading import Thread
+
+from Nonces import NonceGenerator, KeyGenerator, DuplicateDetector
+
+
+class NonceGeneratorTest(unittest.TestCase):
+    def test_nonces_fit_in_the_configured_width(self):
+        generator = NonceGenerator(width=8, pool_size=16)
+        self.assertTrue(all(0 <= generator.next() < 256 for _ in range(100)))
+
+    def test_wide_nonces_do_not_repeat(self):
+        generator = NonceGenerator(pool_size=64)
+        nonces = [generator.next() for _ in range(10000)]
+        self.assertEqual(len(set(nonces)), len(nonces))
+
+    def test_threads_draw_from_their_own_pools_without_repeats(self):
+        generator = NonceGenerator(pool_size=64)
+        nonces = []
+
+        def draw():
+            nonces.extend([generator.next() for _ in range(1000)])
+
+        threads = [Thread(target=draw) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(set(nonces)), 4000)
+
+    def test_thread_pools_grow_up_to_the_pool_size(self):
+        generator = NonceGenerator(pool_size=64, first_pool_size=8)
+        generator.next()
+        self.assertEqual(len(generator.local.pool), 7)
+        sizes = []
+        for _ in range(200):
+            generator.next()
+            sizes.append(generator.local.size)
+        self.assertEqual(max(sizes), 64)
+
+    def test_pool_is_reseeded_after_the_process_id_changes(self):
+        generator = NonceGenerator(pool_size=16)
+        generator.next()
+        del generator.local.pool[:]
+        generator.pid = -1
+        source = generator.source
+        generator.next()
+        self.assertIsNot(generator.source, source)
+
+
+class KeyGeneratorTest(unittest.TestCase):
+    def test_keys_stay_within_the_upper_bound(self):
+        generator = KeyGenerator(upper_bound=10, pool_size=8)
+        self.assertTrue(all(0 <= generator.next() <= 10 for _ in range(100)))
+
+
+class DuplicateDetectorTest(unittest.TestCase):
+    def test_second_sighting_of_a_nonce_is_a_duplicate(self):
+        detector = DuplicateDetector(capacity=4)
+        self.assertFalse(detector.is_duplicate('nonce'))
+        self.assertTrue(detector.is_duplicate('nonce'))
+        self.assertEqual(detector.duplicates, 1)
+
+    def test_oldest_nonce_is_forgotten_when_full(self):
+        detector = DuplicateDetector(capacity=2)
+        for nonce in ['first', 'second', 'third']:
+            detector.is_duplicate(nonce)
+        self.assertFalse(detector.is_duplicate('first'))
+        self.assertTrue(detector.is_duplicate('third'))
+        self.assertEqual(detector.statistics()['remembered'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
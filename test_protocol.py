@@ -0,0 +1,95 @@
+import unittest
+
+from Messages import struct_codec, ClientRequest, TrustedResponse
+from Protocol import ClientMachine, ServerWorkerMachine, TrustedMachine, run_in_memory, SERVER, TRUSTED, CLIENT, \
+    RESULT
+
+
+class ProtocolMachinesTest(unittest.TestCase):
+    def setUp(self):
+        self.client = ClientMachine(client_id='alice', client_key=123, server_id='bob')
+        self.server = ServerWorkerMachine(server_id='bob', server_key=321)
+        self.trusted = TrustedMachine(keys={'alice': 123, 'bob': 321})
+
+    def test_client_begins_with_a_message_for_the_server(self):
+        destination, message = self.client.begin()[0]
+        self.assertEqual(destination, SERVER)
+        self.assertEqual(message[1:3], ('alice', 'bob'))
+        self.assertEqual(self.client.state, 'handshaking')
+
+    def test_server_forwards_a_valid_client_message_to_the_trusted_server(self):
+        _, message = self.client.begin()[0]
+        destination, message_to_trusted = self.server.feed(message)[0]
+        self.assertEqual(destination, TRUSTED)
+        self.assertEqual(len(message_to_trusted), 5)
+
+    def test_server_answers_an_invalid_client_message_directly(self):
+        self.assertEqual(self.server.feed(('broken',)), [(CLIENT, self.server.error_signal)])
+        self.assertEqual(self.server.state, 'finished')
+
+    def test_struct_server_answers_fields_that_do_not_fit_the_ticket_with_error(self):
+        server = ServerWorkerMachine(server_id='bob', server_key=321, codec=struct_codec)
+        self.assertEqual(server.feed(ClientRequest(2, 'a' * 33, 'bob', 'ticket')), [(CLIENT, server.error_signal)])
+        server.reset_session()
+        self.assertEqual(server.feed(ClientRequest(2 ** 63, 'alice', 'bob', 'ticket')),
+                         [(CLIENT, server.error_signal)])
+
+    def test_trusted_answers_the_server(self):
+        _, message = self.client.begin()[0]
+        _, message_to_trusted = self.server.feed(message)[0]
+        destination, answer = self.trusted.feed(message_to_trusted)[0]
+        self.assertEqual(destination, SERVER)
+        self.assertEqual(len(answer), 3)
+
+    def test_finished_machines_ignore_further_messages(self):
+        self.server.feed(('broken',))
+        self.assertEqual(self.server.feed(('broken',)), [])
+
+    def test_failed_resumption_falls_back_to_the_full_handshake(self):
+        self.client.session_key = '12345'
+        destination, message = self.client.begin()[0]
+        self.assertEqual(message[0], self.client.resume_signal)
+        destination, message = self.client.feed(self.client.error_signal)[0]
+        self.assertEqual(destination, SERVER)
+        self.assertEqual(len(message), 4)
+        self.assertEqual(self.client.state, 'handshaking')
+
+    def test_in_memory_handshake_succeeds_and_agrees_on_the_session_key(self):
+        self.assertEqual(run_in_memory(self.client, self.server, self.trusted), self.client.ok_signal)
+        self.assertEqual(self.client.session_key, self.server.session_key)
+        self.assertEqual(self.client.state, 'finished')
+
+    def test_machines_are_reused_across_handshakes(self):
+        results = [run_in_memory(self.client, self.server, self.trusted) for _ in range(100)]
+        self.assertEqual(results, [self.client.ok_signal] * 100)
+
+    def test_in_memory_handshake_with_a_wrong_key_fails(self):
+        self.client.client_key = 124
+        self.assertEqual(run_in_memory(self.client, self.server, self.trusted), self.client.error_signal)
+
+    def test_outgoing_messages_are_typed_records(self):
+        _, message = self.client.begin()[0]
+        self.assertIsInstance(message, ClientRequest)
+        _, message_to_trusted = self.server.feed(message)[0]
+        _, answer = self.trusted.feed(message_to_trusted)[0]
+        self.assertIsInstance(answer, TrustedResponse)
+        self.assertEqual(answer.random_value, message.random_value)
+
+    def test_in_memory_handshake_with_the_struct_codec_succeeds(self):
+        client = ClientMachine(client_id='alice', client_key=123, server_id='bob', codec=struct_codec)
+        server = ServerWorkerMachine(server_id='bob', server_key=321, codec=struct_codec)
+        trusted = TrustedMachine(keys={'alice': 123, 'bob': 321}, codec=struct_codec)
+        self.assertEqual(run_in_memory(client, server, trusted), client.ok_signal)
+        self.assertEqual(client.session_key, server.session_key)
+
+    def test_mismatched_codecs_fail_cleanly(self):
+        trusted = TrustedMachine(keys={'alice': 123, 'bob': 321}, codec=struct_codec)
+        self.assertEqual(run_in_memory(self.client, self.server, trusted), self.client.error_signal)
+
+    def test_result_is_the_last_outgoing_message(self):
+        self.client.begin()
+        self.assertEqual(self.client.feed(self.client.error_signal), [(RESULT, self.client.error_signal)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from ReplayCache import ReplayCache
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ReplayCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ReplayCache(window=30.0, buckets=3, clock=self.clock)
+
+    def test_first_request_is_not_a_replay(self):
+        self.assertFalse(self.cache.is_replay('alice', 'bob', '1', '2'))
+        self.assertEqual(self.cache.accepted, 1)
+
+    def test_same_request_is_a_replay(self):
+        self.cache.is_replay('alice', 'bob', '1', '2')
+        self.assertTrue(self.cache.is_replay('alice', 'bob', '1', '2'))
+        self.assertEqual(self.cache.replays, 1)
+
+    def test_any_differing_field_makes_a_new_request(self):
+        self.cache.is_replay('alice', 'bob', '1', '2')
+        self.assertFalse(self.cache.is_replay('alice', 'bob', '1', '3'))
+        self.assertFalse(self.cache.is_replay('carol', 'bob', '1', '2'))
+
+    def test_request_is_remembered_across_buckets_within_the_window(self):
+        self.cache.is_replay('alice', 'bob', '1', '2')
+        self.clock.now += 15.0
+        self.assertTrue(self.cache.is_replay('alice', 'bob', '1', '2'))
+
+    def test_whole_buckets_expire_after_the_window(self):
+        self.cache.is_replay('alice', 'bob', '1', '2')
+        self.cache.is_replay('alice', 'bob', '3', '4')
+        self.clock.now += 40.0
+        self.assertFalse(self.cache.is_replay('alice', 'bob', '1', '2'))
+        statistics = self.cache.statistics()
+        self.assertEqual(statistics['expired'], 2)
+        self.assertEqual(statistics['size'], 1)
+        self.assertEqual(statistics['buckets'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
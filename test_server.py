@@ -1,7 +1,30 @@
 import unittest
+from Queue import Queue
+from threading import Thread
+from time import time
 
-from Server import Server, ServerWorker
+from Client import Client
+from Messages import struct_codec
+from Nonces import DuplicateDetector
+from Server import Server, ServerWorker, AbstractQueueEntity, AbstractStoppableEntity, TrustedChannel, \
+    TrustedChannelPool
+from TrustedServer import TrustedServer
 from Utils import decrypt, encrypt
+from VirtualEndpoint import AbstractVirtualEndpoint
+
+
+class SilentEndpoint(AbstractVirtualEndpoint):
+    def open_session(self, hello_message):
+        self.hello = hello_message
+        return AbstractVirtualEndpoint.open_session(self, hello_message)
+
+    def send(self, session_id, message):
+        pass
+
+
+class RefusingEndpoint(AbstractVirtualEndpoint):
+    def send(self, session_id, message):
+        self.deliver(session_id, self.error_signal)
 
 
 class ServerTest(unittest.TestCase):
@@ -10,6 +33,431 @@ class ServerTest(unittest.TestCase):
         output = server.get_new_worker()
         self.assertTrue(isinstance(output, ServerWorker))
 
+    def test_workers_talk_to_the_batcher_when_batching(self):
+        server = Server(server_id='123', server_key='kk', max_connections=2, trusted_server=None,
+                        invoke_workers=False, batch_size=4)
+        self.assertIs(server.get_new_worker().trusted_server, server.batcher)
+
+
+class AdmissionControlTest(unittest.TestCase):
+    def create_server(self, **options):
+        return Server(server_id='bob', server_key=321, max_connections=1, trusted_server=None, invoke_workers=False,
+                      **options)
+
+    def test_connection_over_the_wait_budget_is_rejected(self):
+        server = self.create_server(admission_timeout=0)
+        self.assertNotEqual(server.connect(), server.error_signal)
+        self.assertEqual(server.connect(), server.error_signal)
+        self.assertEqual(server.admission_statistics(), {'admitted': 1, 'queued': 1, 'rejected': 1, 'timed_out': 0})
+
+    def test_released_slot_admits_the_next_connection(self):
+        server = self.create_server(admission_timeout=0)
+        server.connect()
+        server.finish_worker(server.workers.queue[0])
+        self.assertNotEqual(server.connect(), server.error_signal)
+
+    def test_pooled_server_rejects_after_waiting_for_a_ready_worker(self):
+        server = self.create_server(admission_timeout=0.01, pool_workers=True)
+        server.start_pool()
+        self.assertNotEqual(server.connect(), server.error_signal)
+        self.assertEqual(server.connect(), server.error_signal)
+
+    def test_per_client_limit_rejects_only_the_busy_client(self):
+        server = Server(server_id='bob', server_key=321, max_connections=5, trusted_server=None,
+                        invoke_workers=False, per_client_limit=1)
+        self.assertNotEqual(server.connect(('HELLO', 'alice')), server.error_signal)
+        self.assertEqual(server.connect(('HELLO', 'alice')), server.error_signal)
+        self.assertNotEqual(server.connect(('HELLO', 'carol')), server.error_signal)
+        alice_worker = server.workers.queue[0]
+        server.finish_worker(alice_worker)
+        self.assertNotEqual(server.connect(('HELLO', 'alice')), server.error_signal)
+
+    def test_each_hello_is_answered_on_its_own_reply_queue(self):
+        server = Server(server_id='bob', server_key=321, max_connections=5, trusted_server=None,
+                        invoke_workers=False, per_client_limit=1)
+        server.start()
+        alice, carol = Queue(), Queue()
+        server.input_queue.put(('HELLO', 'alice', Queue()))
+        server.input_queue.put(('HELLO', 'alice', alice))
+        server.input_queue.put(('HELLO', 'carol', carol))
+        self.assertEqual(alice.get(timeout=5), server.error_signal)
+        self.assertIsInstance(carol.get(timeout=5), tuple)
+        self.assertEqual([worker.connection_owner for worker in server.workers.queue], ['alice', 'carol'])
+        self.assertTrue(server.output_queue.empty())
+        server.finish()
+        server.join(5)
+
+    def test_worker_reports_error_when_the_trusted_server_rejects_it(self):
+        worker = ServerWorker(server_id='bob', server_key=321, trusted_server=None)
+        worker.establish_connection = lambda endpoint: worker.error_signal
+        self.assertFalse(worker.connect_to_trusted())
+
+
+class DeadlineTest(unittest.TestCase):
+    def create_server(self, **options):
+        return Server(server_id='bob', server_key=321, max_connections=1, trusted_server=None, invoke_workers=False,
+                      **options)
+
+    def test_worker_whose_client_never_sends_releases_its_slot(self):
+        server = self.create_server(session_timeout=0.01)
+        server.connect(('HELLO', 'alice'))
+        server.workers.queue[0].run()
+        self.assertEqual(server.workers.qsize(), 0)
+        self.assertEqual(server.admission_statistics()['timed_out'], 1)
+
+    def test_expired_hello_is_rejected_without_taking_a_slot(self):
+        server = self.create_server()
+        self.assertEqual(server.connect(('HELLO', 'alice', None, time() - 1)), server.error_signal)
+        self.assertEqual(server.workers.qsize(), 0)
+        self.assertEqual(server.admission_statistics()['timed_out'], 1)
+
+    def test_worker_inherits_the_earlier_of_the_client_and_server_deadlines(self):
+        client_deadline = time() + 60
+        server = self.create_server()
+        server.connect(('HELLO', 'alice', None, client_deadline))
+        self.assertEqual(server.workers.queue[0].deadline, client_deadline)
+        server = self.create_server(session_timeout=1)
+        server.connect(('HELLO', 'alice', None, client_deadline))
+        self.assertLess(server.workers.queue[0].deadline, client_deadline)
+
+    def test_lost_trusted_reply_answers_the_client_with_error(self):
+        trusted = SilentEndpoint()
+        server = self.create_server(session_timeout=0.05)
+        server.connect(('HELLO', 'alice'))
+        worker = server.workers.queue[0]
+        worker.trusted_server = trusted
+        client = Client(client_id='alice', client_key=123, server=None, server_id='bob')
+        worker.input_queue.put(client.prepare_message_for_server())
+        worker.run()
+        self.assertEqual(worker.output_queue.get(), worker.error_signal)
+        self.assertEqual(trusted.hello[3], worker.deadline)
+        self.assertEqual(trusted.sessions, {})
+        self.assertEqual(server.admission_statistics()['timed_out'], 1)
+
+    def test_client_after_a_timed_out_client_gets_its_own_connection(self):
+        server = Server(server_id='bob', server_key=321, max_connections=1, trusted_server=None,
+                        session_timeout=0.1)
+        server.start()
+        first = Client(client_id='alice', client_key=123, server=server, server_id='bob')
+        self.assertIsInstance(first.establish_connection(server), tuple)
+        impatient = Client(client_id='carol', client_key=123, server=server, server_id='bob', timeout=0.01)
+        impatient.start_deadline()
+        self.assertEqual(impatient.establish_connection(server), impatient.error_signal)
+        second = Client(client_id='dave', client_key=123, server=server, server_id='bob', timeout=1)
+        second.start_deadline()
+        self.assertIsInstance(second.establish_connection(server), tuple)
+        self.assertTrue(server.output_queue.empty())
+        server.finish()
+        server.join(5)
+
+    def test_connection_past_the_deadline_returns_error_signal(self):
+        entity = AbstractQueueEntity()
+        entity.deadline = time() - 1
+        self.assertEqual(entity.establish_connection(AbstractQueueEntity()), entity.error_signal)
+
+
+class ReplayDetectionTest(unittest.TestCase):
+    def test_handshakes_with_fresh_nonces_pass_the_replay_detector(self):
+        trusted = TrustedServer(keys={'alice': 123, 'bob': 321}, max_connections=4)
+        server = Server(server_id='bob', server_key=321, max_connections=4, trusted_server=trusted,
+                        replay_capacity=1024)
+        trusted.start()
+        server.start()
+        results = []
+        for _ in range(20):
+            client = Client(client_id='alice', client_key=123, server=server, server_id='bob')
+            results.append(client.handshake())
+        server.finish()
+        trusted.finish()
+        server.join(5)
+        trusted.join(5)
+        self.assertEqual(results, ['OK'] * 20)
+        self.assertEqual(server.replay_detector.statistics()['remembered'], 20)
+        self.assertEqual(server.replay_detector.duplicates, 0)
+
+
+class TrustedChannelPoolTest(unittest.TestCase):
+    def run_handshakes(self, number, accepts_channels=True, **options):
+        trusted = TrustedServer(keys={'alice': 123, 'bob': 321}, max_connections=4)
+        trusted.accepts_channels = accepts_channels
+        server = Server(server_id='bob', server_key=321, max_connections=8, trusted_server=trusted, **options)
+        trusted.start()
+        server.start()
+        results = []
+
+        def handshake():
+            client = Client(client_id='alice', client_key=123, server=server, server_id='bob')
+            results.append(client.handshake())
+
+        threads = [Thread(target=handshake) for _ in range(number)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        statistics = server.channel_pool.statistics()
+        server.finish()
+        server.join(5)
+        trusted.finish()
+        trusted.join(5)
+        self.assertFalse(server.is_alive())
+        self.assertFalse(trusted.is_alive())
+        return results, statistics, trusted.admission_statistics()
+
+    def test_handshakes_share_the_persistent_channels(self):
+        results, statistics, admissions = self.run_handshakes(20, trusted_channels=2, channel_depth=4)
+        self.assertEqual(results, ['OK'] * 20)
+        self.assertEqual(admissions['admitted'], 2)
+        self.assertEqual(statistics['channels'], 2)
+        self.assertEqual(statistics['requests'], 20)
+        self.assertEqual(sum(statistics['requests_per_channel']), 20)
+        self.assertEqual(statistics['in_flight'], 0)
+        self.assertTrue(0.0 < statistics['utilization'] <= 1.0)
+
+    def test_batches_travel_over_the_channels(self):
+        results, statistics, admissions = self.run_handshakes(10, trusted_channels=1, batch_size=4)
+        self.assertEqual(results, ['OK'] * 10)
+        self.assertEqual(admissions['admitted'], 1)
+
+    def test_endpoint_without_channels_falls_back_to_a_connection_per_session(self):
+        results, statistics, admissions = self.run_handshakes(10, accepts_channels=False, trusted_channels=2)
+        self.assertEqual(results, ['OK'] * 10)
+        self.assertEqual(statistics['channels'], 0)
+        self.assertEqual(admissions['admitted'], 10)
+
+    def test_channel_without_an_acknowledgement_does_not_open(self):
+        pool = TrustedChannelPool(trusted_server=RefusingEndpoint(), size=1, depth=4)
+        self.assertFalse(TrustedChannel(pool.trusted_server, 4, pool, acknowledgement_timeout=0.1).open())
+
+    def test_unexpected_response_closes_the_channel_and_fails_its_sessions(self):
+        pool = TrustedChannelPool(trusted_server=None, size=1, depth=4)
+        channel = TrustedChannel(None, 4, pool)
+        channel.trusted_input, channel.trusted_output = Queue(), Queue()
+        pool.channels.append(channel)
+        channel.start()
+        session_input, session_output = pool.open_session('HELLO')
+        session_input.put('message')
+        channel.trusted_output.put(channel.error_signal)
+        self.assertEqual(session_output.get(timeout=5), pool.error_signal)
+        channel.join(5)
+        self.assertEqual(pool.channels, [])
+
+    def test_without_any_open_channel_sessions_get_the_error_signal(self):
+        pool = TrustedChannelPool(trusted_server=None, size=2, depth=4)
+        session_input, session_output = pool.open_session('HELLO')
+        session_input.put('message')
+        self.assertEqual(session_output.get(timeout=5), pool.error_signal)
+
+
+class StructCodecHandshakeTest(unittest.TestCase):
+    def test_threaded_handshake_with_the_struct_codec_succeeds(self):
+        trusted = TrustedServer(keys={'alice': 123, 'bob': 321}, max_connections=4, codec=struct_codec)
+        server = Server(server_id='bob', server_key=321, max_connections=4, trusted_server=trusted,
+                        codec=struct_codec)
+        trusted.start()
+        server.start()
+        client = Client(client_id='alice', client_key=123, server=server, server_id='bob', codec=struct_codec)
+        result = client.handshake()
+        server.finish()
+        trusted.finish()
+        server.join(5)
+        trusted.join(5)
+        self.assertEqual(result, client.ok_signal)
+
+
+class MultipleAcceptorsTest(unittest.TestCase):
+    def test_handshakes_succeed_and_finish_stops_every_acceptor(self):
+        trusted = TrustedServer(keys={'alice': 123, 'bob': 321}, max_connections=10, acceptors=3)
+        server = Server(server_id='bob', server_key=321, max_connections=10, trusted_server=trusted, acceptors=3)
+        trusted.start()
+        server.start()
+        results = []
+        for _ in range(10):
+            client = Client(client_id='alice', client_key=123, server=server, server_id='bob')
+            results.append(client.handshake())
+        server.finish()
+        trusted.finish()
+        server.join(5)
+        trusted.join(5)
+        self.assertEqual(results, ['OK'] * 10)
+        self.assertFalse(server.is_alive())
+        self.assertFalse(trusted.is_alive())
+
+    def test_an_acceptor_waiting_for_a_slot_does_not_stall_the_others(self):
+        server = Server(server_id='bob', server_key=321, max_connections=1, trusted_server=None,
+                        invoke_workers=False, per_client_limit=1, acceptors=2)
+        server.start()
+        alice, carol = Queue(), Queue()
+        server.input_queue.put(('HELLO', 'alice', alice))
+        self.assertIsInstance(alice.get(timeout=5), tuple)
+        server.input_queue.put(('HELLO', 'carol', carol))
+        server.input_queue.put(('HELLO', 'alice', alice))
+        self.assertEqual(alice.get(timeout=5), server.error_signal)
+        self.assertTrue(carol.empty())
+        server.finish_worker(server.workers.queue[0])
+        self.assertIsInstance(carol.get(timeout=5), tuple)
+        self.assertEqual(server.workers.queue[0].connection_owner, 'carol')
+        server.finish()
+        server.join(5)
+        self.assertFalse(server.is_alive())
+
+
+class StoppableEntityTest(unittest.TestCase):
+    def setUp(self):
+        self.entity = AbstractStoppableEntity()
+
+    def test_waiting_on_the_same_queue_many_times_is_tracked_once(self):
+        for _ in range(100):
+            self.entity.input_queue.put('HELLO')
+            self.entity.get_from_queue(self.entity.input_queue)
+        self.assertEqual(len(self.entity.waiting_queues), 1)
+
+    def test_finish_wakes_a_waiting_queue_once(self):
+        self.entity.input_queue.put('HELLO')
+        self.entity.get_from_queue(self.entity.input_queue)
+        self.entity.finish()
+        self.assertEqual(self.entity.input_queue.qsize(), 1)
+
+    def test_get_after_finish_returns_finish_signal(self):
+        self.entity.finish()
+        self.assertEqual(self.entity.get_from_queue(self.entity.input_queue), self.entity.finish_signal)
+
+    def test_hellos_queued_before_finish_are_still_answered(self):
+        server = Server(server_id='bob', server_key=321, max_connections=5, trusted_server=None,
+                        invoke_workers=False)
+        replies = [Queue() for _ in range(5)]
+        for reply_queue in replies:
+            server.input_queue.put(('HELLO', None, reply_queue))
+        server.finish()
+        server.start()
+        server.join(5)
+        self.assertFalse(server.is_alive())
+        self.assertTrue(all([isinstance(reply_queue.get(timeout=1), tuple) for reply_queue in replies]))
+
+    def test_server_finished_before_it_runs_stops(self):
+        server = Server(server_id='bob', server_key=321, max_connections=2, trusted_server=None)
+        server.finish()
+        server.start()
+        server.join(5)
+        self.assertFalse(server.is_alive())
+
+
+class PooledServerTest(unittest.TestCase):
+    def setUp(self):
+        self.keys = {'alice': 123, 'bob': 321}
+        self.trusted = TrustedServer(keys=self.keys, max_connections=2, pool_workers=True)
+        self.server = Server(server_id='bob', server_key=321, max_connections=2, trusted_server=self.trusted,
+                             pool_workers=True)
+        self.trusted.start()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.finish()
+        self.trusted.finish()
+        self.server.join()
+        self.trusted.join()
+        for worker in self.server.pool + self.trusted.pool:
+            worker.join()
+
+    def handshake(self):
+        client = Client(client_id='alice', client_key=123, server=self.server, server_id='bob')
+        server_input, server_output = client.establish_connection(self.server)
+        server_input.put(client.prepare_message_for_server())
+        return client.process_message_from_server(server_output.get())
+
+    def test_pool_has_max_connections_workers(self):
+        self.handshake()
+        self.assertEqual(len(self.server.pool), 2)
+        self.assertEqual(len(self.trusted.pool), 2)
+
+    def test_pooled_workers_are_reused_across_many_handshakes(self):
+        results = [self.handshake() for _ in range(6)]
+        self.assertEqual(results, ['OK'] * 6)
+        self.assertEqual(len(self.server.pool), 2)
+
+    def test_worker_session_state_is_reset_after_a_handshake(self):
+        self.handshake()
+        self.server.finish()
+        self.server.join()
+        for worker in self.server.pool:
+            worker.join()
+            self.assertIsNone(worker.session_key)
+            self.assertIsNone(worker.nonce)
+
+
+class BatchingServerTest(unittest.TestCase):
+    def setUp(self):
+        self.trusted = TrustedServer(keys={'alice': 123, 'bob': 321}, max_connections=20)
+        self.server = Server(server_id='bob', server_key=321, max_connections=20, trusted_server=self.trusted,
+                             batch_size=8, batch_delay=0.05)
+        self.trusted.start()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.finish()
+        self.trusted.finish()
+        self.server.join()
+        self.trusted.join()
+
+    def handshake(self, results):
+        client = Client(client_id='alice', client_key=123, server=self.server, server_id='bob')
+        server_input, server_output = client.establish_connection(self.server)
+        server_input.put(client.prepare_message_for_server())
+        results.append(client.process_message_from_server(server_output.get()))
+
+    def test_concurrent_handshakes_are_issued_in_fewer_batches(self):
+        results = []
+        threads = [Thread(target=self.handshake, args=(results,)) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['OK'] * 16)
+        self.assertEqual(self.server.batcher.messages_sent, 16)
+        self.assertLess(self.server.batcher.batches_sent, 16)
+
+
+class SessionResumptionTest(unittest.TestCase):
+    def setUp(self):
+        self.trusted = TrustedServer(keys={'alice': 123, 'bob': 321, 'carol': 555}, max_connections=10)
+        self.server = Server(server_id='bob', server_key=321, max_connections=10, trusted_server=self.trusted,
+                             session_cache_size=10)
+        self.trusted.start()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.finish()
+        self.trusted.finish()
+        self.server.join()
+        self.trusted.join()
+
+    def full_handshake(self, client_id, client_key):
+        client = Client(client_id=client_id, client_key=client_key, server=self.server, server_id='bob')
+        self.assertEqual(client.handshake(), 'OK')
+        return client.session_key
+
+    def resume(self, client_id, session_key):
+        client = Client(client_id=client_id, client_key=None, server=self.server, server_id='bob',
+                        session_key=session_key)
+        return client.process_resumption_from_server(client.send_to_server(client.prepare_resumption_for_server()))
+
+    def test_server_caches_the_session_key_from_the_trusted_server(self):
+        session_key = self.full_handshake('alice', 123)
+        self.assertEqual(self.server.session_cache.lookup('alice'), session_key)
+
+    def test_reconnecting_client_resumes_without_the_trusted_server(self):
+        session_key = self.full_handshake('alice', 123)
+        self.assertEqual(self.resume('alice', session_key), 'OK')
+        self.assertEqual(self.server.session_cache.statistics()['trusted_server_avoided'], 1)
+
+    def test_resumption_with_a_wrong_session_key_fails(self):
+        session_key = self.full_handshake('alice', 123)
+        self.assertEqual(self.resume('alice', str(int(session_key) + 1)), 'ERROR')
+
+    def test_resumption_of_an_unknown_client_fails(self):
+        self.full_handshake('alice', 123)
+        self.assertEqual(self.resume('carol', '12345'), 'ERROR')
+        self.assertEqual(self.server.session_cache.statistics()['trusted_server_avoided'], 0)
+
 
 class ServerWorkerTest(unittest.TestCase):
     def setUp(self):
@@ -85,6 +533,18 @@ class ServerWorkerTest(unittest.TestCase):
         self.assertEqual(isinstance(output, tuple), True)
         self.assertEqual(len(output), 2)
 
+    def test_replayed_answer_from_trusted_returns_error_signal(self):
+        server_key = 178
+        self.worker = ServerWorker(server_id='server_id_123', server_key=server_key, trusted_server=None,
+                                   replay_detector=DuplicateDetector(16))
+        nested = encrypt('{0}:{1}'.format('server_nonce', 'session_key'), server_key)
+        self.worker.nonce = 'server_nonce'
+        self.worker.client_random_value = self.random_value
+        message = (self.random_value, 'encrypted_client_message', nested)
+        self.assertEqual(len(self.worker.create_response_for_client_from_message_from_trusted(message)), 2)
+        self.assertEqual(self.worker.create_response_for_client_from_message_from_trusted(message),
+                         self.worker.error_signal)
+
 
 if __name__ == '__main__':
     unittest.main()
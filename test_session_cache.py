@@ -0,0 +1,56 @@
+import unittest
+
+from SessionCache import SessionCache
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class SessionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = SessionCache(ttl=10.0, max_size=2, clock=self.clock)
+
+    def test_stored_session_key_is_returned(self):
+        self.cache.store('alice', '12345')
+        self.assertEqual(self.cache.lookup('alice'), '12345')
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_unknown_client_is_a_miss(self):
+        self.assertIsNone(self.cache.lookup('alice'))
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_expired_session_key_is_dropped(self):
+        self.cache.store('alice', '12345')
+        self.clock.now += 10.0
+        self.assertIsNone(self.cache.lookup('alice'))
+        self.assertEqual(self.cache.expirations, 1)
+        self.assertEqual(self.cache.statistics()['size'], 0)
+
+    def test_oldest_entry_is_evicted_when_full(self):
+        self.cache.store('alice', '1')
+        self.cache.store('bob', '2')
+        self.cache.store('carol', '3')
+        self.assertIsNone(self.cache.lookup('alice'))
+        self.assertEqual(self.cache.lookup('carol'), '3')
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_storing_again_refreshes_the_entry(self):
+        self.cache.store('alice', '1')
+        self.clock.now += 8.0
+        self.cache.store('alice', '2')
+        self.clock.now += 8.0
+        self.assertEqual(self.cache.lookup('alice'), '2')
+
+    def test_resumptions_are_counted(self):
+        self.cache.record_resumption()
+        self.assertEqual(self.cache.statistics()['trusted_server_avoided'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
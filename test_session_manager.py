@@ -0,0 +1,102 @@
+import unittest
+
+from Server import Server
+from SessionManager import ClientSessionManager, SessionFuture
+from TrustedServer import TrustedServer
+
+
+class SessionFutureTest(unittest.TestCase):
+    def test_callback_added_after_completion_runs_immediately(self):
+        future = SessionFuture('alice', 'bob')
+        future.resolve('12345')
+        calls = []
+        future.add_done_callback(calls.append)
+        self.assertEqual(calls, [future])
+        self.assertEqual(future.result(), '12345')
+
+    def test_unresolved_future_is_not_done(self):
+        future = SessionFuture('alice', 'bob')
+        self.assertFalse(future.done())
+        self.assertIsNone(future.result(timeout=0.01))
+        self.assertFalse(future.failed())
+
+
+class ClientSessionManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.keys = {'server_{0}'.format(number): 300 + number for number in range(3)}
+        self.keys.update({'client_{0}'.format(number): 100 + number for number in range(10)})
+        self.trusted = TrustedServer(keys=self.keys, max_connections=8)
+        self.servers = [Server(server_id=server_id, server_key=self.keys[server_id], max_connections=4,
+                               trusted_server=self.trusted, session_cache_size=64)
+                        for server_id in sorted(self.keys) if server_id.startswith('server')]
+        self.trusted.start()
+        for server in self.servers:
+            server.start()
+        self.manager = ClientSessionManager({server.server_id: server for server in self.servers}, workers=4)
+
+    def tearDown(self):
+        self.manager.close()
+        for server in self.servers:
+            server.finish()
+            server.join(5)
+        self.trusted.finish()
+        self.trusted.join(5)
+
+    def request_all(self):
+        return [self.manager.request_session(client_id, self.keys[client_id], server.server_id)
+                for client_id in sorted(self.keys) if client_id.startswith('client')
+                for server in self.servers]
+
+    def test_every_pair_gets_a_session_key(self):
+        futures = self.request_all()
+        self.assertTrue(all([future.result(timeout=5) is not None for future in futures]))
+        self.assertEqual(self.manager.statistics()['completed'], 30)
+        self.assertEqual(self.manager.statistics()['known_sessions'], 30)
+
+    def test_callbacks_receive_the_resolved_future(self):
+        resolved = []
+        future = self.manager.request_session('client_0', self.keys['client_0'], 'server_0', resolved.append)
+        future.result(timeout=5)
+        self.assertEqual(resolved, [future])
+
+    def test_unknown_server_fails_without_a_handshake(self):
+        future = self.manager.request_session('client_0', self.keys['client_0'], 'missing')
+        self.assertTrue(future.failed())
+        self.assertEqual(self.manager.statistics()['failed'], 1)
+
+    def test_raising_callback_does_not_stop_the_workers(self):
+        def explode(future):
+            raise RuntimeError('callback failed')
+
+        futures = [self.manager.request_session('client_0', self.keys['client_0'], 'server_0', explode)
+                   for _ in range(8)]
+        self.assertTrue(all([future.result(timeout=5) is not None for future in futures]))
+        self.assertEqual([len(future.callback_errors) for future in futures], [1] * 8)
+        later = self.manager.request_session('client_1', self.keys['client_1'], 'server_1')
+        self.assertIsNotNone(later.result(timeout=5))
+
+    def test_handshake_that_raises_fails_only_its_own_future(self):
+        self.manager.register('broken', object())
+        broken = [self.manager.request_session('client_0', self.keys['client_0'], 'broken') for _ in range(8)]
+        later = self.manager.request_session('client_1', self.keys['client_1'], 'server_1')
+        self.assertIsNotNone(later.result(timeout=5))
+        self.assertTrue(all([future.result(timeout=5) is None for future in broken]))
+        self.assertTrue(all([isinstance(future.error, AttributeError) for future in broken]))
+        self.assertIsNone(later.error)
+
+    def test_wrong_client_key_fails(self):
+        future = self.manager.request_session('client_0', 999, 'server_0')
+        self.assertIsNone(future.result(timeout=5))
+        self.assertTrue(future.failed())
+        self.assertIsNone(future.error)
+
+    def test_known_sessions_are_resumed_without_the_trusted_server(self):
+        first = [future.result(timeout=5) for future in self.request_all()]
+        second = [future.result(timeout=5) for future in self.request_all()]
+        self.assertEqual(first, second)
+        avoided = sum([server.session_cache.statistics()['trusted_server_avoided'] for server in self.servers])
+        self.assertEqual(avoided, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
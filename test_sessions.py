@@ -0,0 +1,42 @@
+import unittest
+
+from Client import Client
+from Server import ServerWorker
+from Sessions import ClientSession, ServerSession, TrustedSession
+from TrustedServer import TrustedServerWorker
+
+
+class SessionRecordTest(unittest.TestCase):
+    def test_records_start_empty(self):
+        for session_class in [ClientSession, ServerSession, TrustedSession]:
+            session = session_class()
+            self.assertEqual([getattr(session, name) for name in session_class.__slots__],
+                             [None] * len(session_class.__slots__))
+
+    def test_records_have_no_instance_dictionary(self):
+        self.assertRaises(AttributeError, setattr, ServerSession(), 'unexpected', 1)
+
+
+class SessionDelegationTest(unittest.TestCase):
+    def test_worker_state_lives_in_the_session_record(self):
+        worker = ServerWorker(server_id='bob', server_key=321, trusted_server=None)
+        worker.nonce = 'nonce'
+        self.assertEqual(worker.session.nonce, 'nonce')
+        self.assertNotIn('nonce', worker.__dict__)
+
+    def test_swapping_the_session_switches_the_state(self):
+        worker = TrustedServerWorker(keys={})
+        first = worker.session
+        worker.client_nonce = 'first'
+        worker.session = TrustedSession()
+        self.assertIsNone(worker.client_nonce)
+        worker.session = first
+        self.assertEqual(worker.client_nonce, 'first')
+
+    def test_client_keeps_the_session_key_it_was_given(self):
+        client = Client(client_id='alice', client_key=123, session_key='4711')
+        self.assertEqual(client.session.session_key, '4711')
+
+
+if __name__ == '__main__':
+    unittest.main()
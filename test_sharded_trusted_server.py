@@ -0,0 +1,95 @@
+import unittest
+
+from Client import Client
+from Messages import struct_codec
+from Server import Server
+from ShardedTrustedServer import ShardedTrustedServer, shard_for
+from Utils import prepare_inner_message
+
+
+class ShardForTest(unittest.TestCase):
+    def test_shard_is_within_range(self):
+        for identifier in ['alice', 'bob', 'client-{0}'.format(123), 42]:
+            self.assertIn(shard_for(identifier, 3), range(3))
+
+    def test_shard_is_stable(self):
+        self.assertEqual(shard_for('alice', 7), shard_for('alice', 7))
+
+
+class ShardedTrustedServerTest(unittest.TestCase):
+    def setUp(self):
+        self.keys = dict(('client-{0}'.format(number), 100 + number) for number in range(20))
+        self.keys['bob'] = 321
+        self.trusted = ShardedTrustedServer(keys=self.keys, max_connections=10, shards=2, server_ids=['bob'])
+
+    def test_every_shard_holds_its_slice_and_the_server_keys(self):
+        for number, shard in enumerate(self.trusted.shards):
+            self.assertIn('bob', shard.keys)
+            for identifier in shard.keys:
+                if identifier != 'bob':
+                    self.assertEqual(shard_for(identifier, 2), number)
+        self.assertEqual(sum(len(shard.keys) for shard in self.trusted.shards), len(self.keys) + 1)
+
+    def test_missing_server_ids_are_rejected(self):
+        self.assertRaises(ValueError, ShardedTrustedServer, keys=self.keys, max_connections=10, shards=2,
+                          server_ids=[])
+
+    def test_handshakes_through_a_server_succeed_on_every_shard(self):
+        server = Server(server_id='bob', server_key=321, max_connections=10, trusted_server=self.trusted)
+        self.trusted.start()
+        server.start()
+        try:
+            results = []
+            for number in range(6):
+                client_id = 'client-{0}'.format(number)
+                client = Client(client_id=client_id, client_key=self.keys[client_id], server=server,
+                                server_id='bob')
+                results.append(client.handshake())
+            self.assertEqual(results, ['OK'] * 6)
+        finally:
+            server.finish()
+            self.trusted.finish()
+            server.join()
+            self.trusted.join()
+
+    def test_handshake_with_the_struct_codec_succeeds(self):
+        trusted = ShardedTrustedServer(keys=self.keys, max_connections=10, shards=2, server_ids=['bob'],
+                                       codec=struct_codec)
+        server = Server(server_id='bob', server_key=321, max_connections=10, trusted_server=trusted,
+                        codec=struct_codec)
+        trusted.start()
+        server.start()
+        try:
+            results = []
+            for number in range(4):
+                client_id = 'client-{0}'.format(number)
+                client = Client(client_id=client_id, client_key=self.keys[client_id], server=server,
+                                server_id='bob', codec=struct_codec)
+                results.append(client.handshake())
+            self.assertEqual(results, ['OK'] * 4)
+        finally:
+            server.finish()
+            trusted.finish()
+            server.join()
+            trusted.join()
+
+    def test_batch_spanning_shards_keeps_the_order_of_answers(self):
+        self.trusted.start()
+        try:
+            messages = []
+            for number in range(4):
+                client_id = 'client-{0}'.format(number)
+                messages.append((number + 1, client_id, 'bob',
+                                 prepare_inner_message(self.keys[client_id], 'n', number + 1, client_id, 'bob'),
+                                 prepare_inner_message(321, 'm', number + 1, client_id, 'bob')))
+            worker = self.trusted.get_new_worker()
+            answers = worker.dispatch_batch(messages + ['broken'])
+            self.assertEqual([answer[0] for answer in answers[:4]], [1, 2, 3, 4])
+            self.assertEqual(answers[4], worker.error_signal)
+        finally:
+            self.trusted.finish()
+            self.trusted.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+
+from Client import Client
+from Messages import struct_codec
+from Server import Server
+from SharedMemory import SharedRing, SharedMemoryTrustedServer, classify
+from Transport import WireFormatError
+
+
+class SharedRingTest(unittest.TestCase):
+    def setUp(self):
+        self.ring = SharedRing(slots=2, slot_size=128)
+
+    def test_request_round_trips(self):
+        request = (12345, 'alice', 'bob', 'client_part', 'server_part')
+        self.ring.put(7, request)
+        self.assertEqual(self.ring.get(), (7, request))
+
+    def test_response_and_signal_round_trip(self):
+        self.ring.put(1, (12345, 'client_part', 'server_part'))
+        self.ring.put(2, 'ERROR')
+        self.assertEqual(self.ring.get(), (1, (12345, 'client_part', 'server_part')))
+        self.assertEqual(self.ring.get(), (2, 'ERROR'))
+
+    def test_slots_are_reused_after_wrapping_around(self):
+        for session_id in range(5):
+            self.ring.put(session_id, (session_id, 'a', 'b'))
+            self.assertEqual(self.ring.get(), (session_id, (session_id, 'a', 'b')))
+
+    def test_stop_marker_decodes_to_none(self):
+        self.ring.put(0, None)
+        self.assertEqual(self.ring.get(), (0, None))
+
+    def test_message_larger_than_a_slot_is_rejected(self):
+        self.assertRaises(WireFormatError, self.ring.put, 0, (1, 'x' * 200, 'y'))
+
+    def test_rejected_number_leaves_the_ring_usable(self):
+        self.assertRaises(WireFormatError, self.ring.put, 1, (2 ** 63, 'alice', 'bob', 'a', 'b'))
+        self.ring.put(2, (5, 'a', 'b'))
+        self.assertEqual(self.ring.get(), (2, (5, 'a', 'b')))
+
+    def test_unsupported_shape_is_rejected(self):
+        self.assertRaises(WireFormatError, classify, ('BATCH', []))
+        self.assertRaises(WireFormatError, classify, (1, 2, 3))
+
+
+class SharedMemoryHandshakeTest(unittest.TestCase):
+    def setUp(self):
+        self.trusted = SharedMemoryTrustedServer(keys={'alice': 123, 'bob': 321}, slots=4)
+        self.server = Server(server_id='bob', server_key=321, max_connections=8, trusted_server=self.trusted)
+        self.trusted.start()
+        self.server.start()
+
+    def tearDown(self):
+        self.server.finish()
+        self.trusted.finish()
+        self.server.join(5)
+        self.trusted.join(5)
+
+    def handshake(self):
+        client = Client(client_id='alice', client_key=123, server=self.server, server_id='bob')
+        return client.handshake()
+
+    def test_handshakes_succeed_through_the_trusted_server_process(self):
+        self.assertEqual([self.handshake() for _ in range(10)], ['OK'] * 10)
+
+    def test_oversized_request_gets_the_error_signal(self):
+        session_input, session_output = self.trusted.open_session('HELLO')
+        session_input.put((1, 'alice', 'bob', 'x' * 8192, 'y'))
+        self.assertEqual(session_output.get(timeout=5), self.trusted.error_signal)
+
+    def test_out_of_range_request_does_not_break_later_handshakes(self):
+        session_input, session_output = self.trusted.open_session('HELLO')
+        session_input.put((2 ** 63, 'alice', 'bob', 'a', 'b'))
+        self.assertEqual(session_output.get(timeout=5), self.trusted.error_signal)
+        self.assertEqual([self.handshake() for _ in range(3)], ['OK'] * 3)
+
+
+class SharedMemoryCodecTest(unittest.TestCase):
+    def test_handshake_with_the_struct_codec_succeeds(self):
+        trusted = SharedMemoryTrustedServer(keys={'alice': 123, 'bob': 321}, slots=4, codec=struct_codec)
+        server = Server(server_id='bob', server_key=321, max_connections=8, trusted_server=trusted,
+                        codec=struct_codec)
+        trusted.start()
+        server.start()
+        try:
+            client = Client(client_id='alice', client_key=123, server=server, server_id='bob', codec=struct_codec)
+            self.assertEqual(client.handshake(), 'OK')
+        finally:
+            server.finish()
+            trusted.finish()
+            server.join(5)
+            trusted.join(5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from threading import Thread
+
+from Client import Client
+from Server import Server
+from Transport import TransportServer, RemoteEndpoint, encode_frame, receive_frame, decode_payload, \
+    WireFormatError, frame_header, max_frame_size
+from TrustedServer import TrustedServer
+
+
+class FakeConnection(object):
+    def __init__(self, data):
+        self.data = data
+
+    def recv(self, size):
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+
+class WireFormatTest(unittest.TestCase):
+    def round_trip(self, message):
+        return receive_frame(FakeConnection(encode_frame(7, message)))
+
+    def test_tuple_of_strings_and_numbers_round_trips(self):
+        message = (471928, 'client_id', 'server_id', 'nested\x00:\xff', 'other')
+        self.assertEqual(self.round_trip(message), (7, message))
+
+    def test_error_signal_round_trips(self):
+        self.assertEqual(self.round_trip('ERROR'), (7, 'ERROR'))
+
+    def test_lists_and_nested_tuples_keep_their_types(self):
+        message = ('BATCH', [(1, 'a'), 'ERROR'], None)
+        self.assertEqual(self.round_trip(message), (7, message))
+
+    def test_truncated_stream_returns_none(self):
+        frame = encode_frame(1, ('a', 'b'))
+        self.assertIsNone(receive_frame(FakeConnection(frame[:-1])))
+
+    def test_trailing_bytes_in_payload_are_rejected(self):
+        self.assertRaises(WireFormatError, decode_payload, 'N' + 'N')
+
+    def test_unsupported_values_are_rejected(self):
+        self.assertRaises(WireFormatError, encode_frame, 1, 1.5)
+
+    def test_integers_outside_int64_are_rejected(self):
+        self.assertRaises(WireFormatError, encode_frame, 1, (2 ** 63, 'a'))
+
+    def test_deep_nesting_is_rejected(self):
+        self.assertRaises(WireFormatError, decode_payload, 'T\x00\x01' * 5000 + 'N')
+
+    def test_frame_longer_than_the_limit_is_rejected(self):
+        self.assertRaises(WireFormatError, receive_frame, FakeConnection(frame_header.pack(max_frame_size + 1, 1)))
+
+
+class TransportHandshakeTest(unittest.TestCase):
+    def setUp(self):
+        self.keys = {'alice': 123, 'bob': 321}
+        self.trusted = TrustedServer(keys=self.keys, max_connections=20)
+        self.trusted.start()
+        self.trusted_transport = TransportServer(self.trusted)
+        self.trusted_transport.start()
+        self.remote_trusted = RemoteEndpoint(self.trusted_transport.address)
+        self.server = Server(server_id='bob', server_key=321, max_connections=20,
+                             trusted_server=self.remote_trusted)
+        self.server.start()
+        self.server_transport = TransportServer(self.server)
+        self.server_transport.start()
+        self.remote_server = RemoteEndpoint(self.server_transport.address)
+
+    def tearDown(self):
+        self.remote_server.close()
+        self.remote_trusted.close()
+        self.server_transport.finish()
+        self.trusted_transport.finish()
+        self.server.finish()
+        self.trusted.finish()
+        self.server.join()
+        self.trusted.join()
+
+    def handshake(self, results):
+        client = Client(client_id='alice', client_key=123, server=self.remote_server, server_id='bob')
+        server_input, server_output = client.establish_connection(self.remote_server)
+        server_input.put(client.prepare_message_for_server())
+        results.append(client.process_message_from_server(server_output.get()))
+
+    def test_handshake_over_localhost_succeeds(self):
+        results = []
+        self.handshake(results)
+        self.assertEqual(results, ['OK'])
+
+    def test_many_in_flight_handshakes_share_one_connection(self):
+        results = []
+        threads = [Thread(target=self.handshake, args=(results,)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['OK'] * 10)
+
+    def test_request_that_cannot_be_framed_gets_the_error_signal(self):
+        session_input, session_output = self.remote_trusted.open_session('HELLO')
+        session_input.put((2 ** 63, 'alice', 'bob', 'a', 'b'))
+        self.assertEqual(session_output.get(timeout=5), self.remote_trusted.error_signal)
+
+    def test_closed_connection_fails_open_sessions(self):
+        session_input, session_output = self.remote_server.open_session('HELLO')
+        self.server_transport.finish()
+        self.assertEqual(session_output.get(timeout=5), 'ERROR')
+
+
+if __name__ == '__main__':
+    unittest.main()
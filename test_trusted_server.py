@@ -2,6 +2,7 @@ import unittest
 from Queue import Queue
 from threading import Thread
 
+from ReplayCache import ReplayCache
 from TrustedServer import TrustedServer, TrustedServerWorker
 from Utils import encrypt, decrypt
 
@@ -37,6 +38,25 @@ class TrustedServerTest(unittest.TestCase):
         output = self.trusted.output_queue.get()
         self.assertTrue(isinstance(output, tuple))
 
+    def test_workers_share_the_cipher_cache(self):
+        first = self.trusted.get_new_worker()
+        second = self.trusted.get_new_worker()
+        self.assertIs(first.cipher_cache, second.cipher_cache)
+
+    def test_workers_share_the_replay_cache(self):
+        self.trusted = TrustedServer(keys={}, max_connections=123, invoke_workers=False, replay_window=30)
+        first = self.trusted.get_new_worker()
+        second = self.trusted.get_new_worker()
+        self.assertIs(first.replay_cache, self.trusted.replay_cache)
+        self.assertIs(first.replay_cache, second.replay_cache)
+
+    def test_session_without_a_request_times_out_and_releases_its_slot(self):
+        self.trusted = TrustedServer(keys={}, max_connections=1, invoke_workers=False, session_timeout=0.01)
+        self.trusted.connect()
+        self.trusted.workers.queue[0].run()
+        self.assertEqual(self.trusted.workers.qsize(), 0)
+        self.assertEqual(self.trusted.admission_statistics()['timed_out'], 1)
+
     def put_multiple_messages_on_queue(self, number):
         for _ in range(number):
             self.put_message_on_queue()
@@ -152,6 +172,12 @@ class TrustedServerWorkerTestCase(unittest.TestCase):
         self.assertNotEqual(third_key, second_key)
         self.assertNotEqual(third_key, fourth_key)
 
+    def test_client_and_server_receive_the_same_session_key(self):
+        output = self.worker.process_message_from_server_and_generate_answer(self.prepare_connect_message())
+        client_session_key = self.decrypt_and_split(self.client_key, output[1])[1]
+        server_session_key = self.decrypt_and_split(self.server_key, output[2])[1]
+        self.assertEqual(client_session_key, server_session_key)
+
     def test_third_segment_contains_server_nonce(self):
         nonce_from_server = 'secret_server_nonce'
         connect_message = self.prepare_connect_message(server_nonce=nonce_from_server)
@@ -159,6 +185,55 @@ class TrustedServerWorkerTestCase(unittest.TestCase):
         decrypted_third_segment = self.decrypt_and_split(self.server_key, output[2])
         self.assertEqual(decrypted_third_segment[0], nonce_from_server)
 
+    def test_batch_returns_one_answer_per_request(self):
+        valid = self.prepare_connect_message()
+        invalid = self.prepare_connect_message(client_random_value=123)
+        answers = self.worker.process_batch_from_server([valid, invalid, valid])
+        self.assertEqual(len(answers), 3)
+        self.assertEqual(answers[0][0], self.random_value)
+        self.assertEqual(answers[1], self.worker.error_signal)
+        self.assertEqual(answers[2][0], self.random_value)
+
+    def test_batch_items_do_not_leak_state_into_each_other(self):
+        first = self.prepare_connect_message(client_nonce='first_nonce')
+        second = self.prepare_connect_message(client_nonce='second_nonce')
+        answers = self.worker.process_batch_from_server([first, second])
+        self.assertEqual(self.decrypt_and_split(self.client_key, answers[1][1])[0], 'second_nonce')
+
+    def test_batch_message_is_recognised(self):
+        self.assertTrue(self.worker.is_batch_message(('BATCH', [])))
+        self.assertFalse(self.worker.is_batch_message(self.prepare_connect_message()))
+
+    def test_malformed_batch_returns_error_signal(self):
+        self.assertEqual(self.worker.process_batch_from_server('BATCH'), self.worker.error_signal)
+
+    def test_replayed_request_returns_error_signal(self):
+        self.worker.replay_cache = ReplayCache()
+        connect_message = self.prepare_connect_message()
+        self.assertEqual(self.worker.process_message_from_server_and_generate_answer(connect_message)[0],
+                         self.random_value)
+        output = self.worker.process_message_from_server_and_generate_answer(connect_message)
+        self.assertEqual(output, self.worker.error_signal)
+        self.assertEqual(self.worker.replay_cache.replays, 1)
+
+    def test_requests_with_fresh_nonces_are_not_replays(self):
+        self.worker.replay_cache = ReplayCache()
+        first = self.prepare_connect_message(client_nonce='first_nonce')
+        second = self.prepare_connect_message(client_nonce='second_nonce')
+        answers = self.worker.process_batch_from_server([first, second])
+        self.assertNotEqual(answers[1], self.worker.error_signal)
+
+    def test_channel_answers_every_request_with_its_correlation_id(self):
+        self.worker.input_queue.put(('CHANNEL',))
+        self.worker.input_queue.put((7, self.prepare_connect_message()))
+        self.worker.input_queue.put((8, 'broken'))
+        self.worker.input_queue.put(None)
+        self.worker.handle_session()
+        self.assertEqual(self.worker.output_queue.get(), ('CHANNEL',))
+        self.assertEqual(self.worker.output_queue.get()[0], 7)
+        self.assertEqual(self.worker.output_queue.get(), (8, self.worker.error_signal))
+        self.assertIsNone(self.worker.output_queue.get())
+
     def test_returns_error_signal_on_not_matching_client_id(self):
         client_id_one = '1'
         client_id_two = '2'
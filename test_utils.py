@@ -1,6 +1,8 @@
 import unittest
 
-from Utils import generate_random_key, encrypt, decrypt
+import Utils
+from Utils import generate_random_key, encrypt, decrypt, encrypt_by_character, decrypt_by_character, encrypt_many, \
+    decrypt_many, parse_encrypted_fields, InvalidMessage
 
 
 class GenerateRandomKeyTest(unittest.TestCase):
@@ -52,5 +54,82 @@ class DecryptEncryptGenerateRandomKeyTest(unittest.TestCase):
         self.assertEquals(original_message, decrypted_message)
 
 
+class TranslationTableTest(unittest.TestCase):
+    def setUp(self):
+        self.message = ''.join([chr(code) for code in range(256)]) * 2
+
+    def test_encrypt_matches_character_by_character_encryption(self):
+        for key in [0, 1, 123, 255, 256, 1231241, -17]:
+            self.assertEqual(encrypt(self.message, key), encrypt_by_character(self.message, key))
+
+    def test_decrypt_matches_character_by_character_decryption(self):
+        for key in [0, 1, 123, 255, 256, 1231241, -17]:
+            self.assertEqual(decrypt(self.message, key), decrypt_by_character(self.message, key))
+
+    def test_encrypt_converts_non_string_messages(self):
+        self.assertEqual(encrypt(12345, 77), encrypt_by_character(12345, 77))
+
+
+class BulkCipherTest(unittest.TestCase):
+    def setUp(self):
+        self.messages = ['', 'a', 'message text', ''.join([chr(code) for code in range(256)]), 12345]
+        self.keys = [1, 123, 255, 1231241, -17]
+
+    def test_encrypt_many_matches_encrypt(self):
+        expected = [encrypt(message, key) for message, key in zip(self.messages, self.keys)]
+        self.assertEqual(encrypt_many(self.messages, self.keys), expected)
+
+    def test_decrypt_many_matches_decrypt(self):
+        messages = [str(message) for message in self.messages]
+        expected = [decrypt(message, key) for message, key in zip(messages, self.keys)]
+        self.assertEqual(decrypt_many(messages, self.keys), expected)
+
+    def test_empty_batch_returns_empty_list(self):
+        self.assertEqual(encrypt_many([], []), [])
+
+    def test_mismatched_keys_raise_value_error(self):
+        self.assertRaises(ValueError, encrypt_many, ['a', 'b'], [1])
+
+    def test_pure_python_fallback_matches(self):
+        numpy, Utils.numpy = Utils.numpy, None
+        try:
+            self.assertEqual(decrypt_many(encrypt_many(self.messages, self.keys), self.keys),
+                             [str(message) for message in self.messages])
+        finally:
+            Utils.numpy = numpy
+
+
+class ParseEncryptedFieldsTest(unittest.TestCase):
+    def setUp(self):
+        self.key = 1231241
+        self.converters = (str, int, str, str)
+
+    def parse(self, plain_text):
+        return parse_encrypted_fields(encrypt(plain_text, self.key), self.key, self.converters)
+
+    def test_fields_are_decrypted_and_converted(self):
+        self.assertEqual(self.parse('nonce:123:alice:bob'), ['nonce', 123, 'alice', 'bob'])
+
+    def test_too_few_fields_raise_index_error(self):
+        self.assertRaises(IndexError, self.parse, 'nonce:123:alice')
+
+    def test_too_many_fields_raise_index_error(self):
+        self.assertRaises(IndexError, self.parse, 'nonce:123:alice:bob:carol')
+
+    def test_empty_field_raises_invalid_message(self):
+        self.assertRaises(InvalidMessage, self.parse, 'nonce::alice:bob')
+
+    def test_malformed_number_raises_value_error(self):
+        self.assertRaises(ValueError, self.parse, 'nonce:12x:alice:bob')
+
+    def test_wrong_key_does_not_parse(self):
+        encrypted = encrypt('nonce:123:alice:bob', self.key)
+        self.assertRaises(IndexError, parse_encrypted_fields, encrypted, self.key + 1, self.converters)
+
+    def test_unicode_messages_match_the_character_path(self):
+        encrypted = unicode(encrypt('nonce:123:alice:bob', self.key), 'latin-1')
+        self.assertEqual(parse_encrypted_fields(encrypted, self.key, self.converters), ['nonce', 123, 'alice', 'bob'])
+
+
 if __name__ == '__main__':
     unittest.main()